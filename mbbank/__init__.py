@@ -140,14 +140,18 @@ __version__ = "0.3.2"
 
 import mbbank.aio as aio
 import mbbank.base as base
+import mbbank.cache as cache
 import mbbank.capcha_ocr as capcha_ocr
 import mbbank.encryption_backend as encryption_backend
 import mbbank.errors as errors
 import mbbank.modals as modals
+import mbbank.session_store as session_store
 import mbbank.sync as sync
+import mbbank.transaction_store as transaction_store
+import mbbank.transport as transport
 
 from .aio import BulkTransferContextAsync, MBBankAsync, TransferContextAsync
-from .capcha_ocr import CapchaOCR, CapchaProcessing
+from .capcha_ocr import CapchaOCR, CapchaProcessing, ProcessPoolCapchaOCR
 from .sync import BulkTransferContext, MBBank, TransferContext
 
 __all__ = [
@@ -157,15 +161,20 @@ __all__ = [
     "CapchaProcessing",
     "MBBank",
     "MBBankAsync",
+    "ProcessPoolCapchaOCR",
     "TransferContext",
     "TransferContextAsync",
     "__version__",
     # Export submodules for documentation purposes
     "aio",
     "base",
+    "cache",
     "capcha_ocr",
     "encryption_backend",
     "errors",
     "modals",
+    "session_store",
     "sync",
+    "transaction_store",
+    "transport",
 ]
@@ -76,10 +76,9 @@ class BulkTransferContextAsync(BulkTransferContextBase):
         Raises:
             BankNotFoundError: if bank code not found in bank list
         """
-        bank_list = await self.mbbank.getBankList()
-        for bank in bank_list.listBank:
-            if bank.smlCode == account.benBankCode:
-                return bank
+        bank = (await self.mbbank.getBankDirectory()).by_sml_code(account.benBankCode)
+        if bank is not None:
+            return bank
         raise BankNotFoundError("Bank code not found in bank list")
 
     async def verify_transfer(self) -> BulkTransferResponseModal:
@@ -100,7 +99,7 @@ class BulkTransferContextAsync(BulkTransferContextBase):
             "sourceNumber": self.src_account,
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail-bulkpaymentms/v1.0/verify-bulk-payment",
+            "/api/retail-bulkpaymentms/v1.0/verify-bulk-payment",
             json=json_data,
             encrypt=True,
         )
@@ -126,7 +125,7 @@ class BulkTransferContextAsync(BulkTransferContextBase):
             "serviceCode": "BULK_TRANSFER",
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/internetbanking/getAuthList",
+            "/api/retail_web/internetbanking/getAuthList",
             json=json_data,
             encrypt=True,
         )
@@ -162,7 +161,7 @@ class BulkTransferContextAsync(BulkTransferContextBase):
             }
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/vtap/createTransactionAuthen",
+            "/api/retail_web/vtap/createTransactionAuthen",
             json=json_data,
             encrypt=True,
         )
@@ -196,7 +195,7 @@ class BulkTransferContextAsync(BulkTransferContextBase):
             "otp": otp_crafted,
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail-bulkpaymentms/v1.0/make-bulk-payment",
+            "/api/retail-bulkpaymentms/v1.0/make-bulk-payment",
             json=json_data,
             encrypt=True,
         )
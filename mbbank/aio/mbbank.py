@@ -1,11 +1,23 @@
+import asyncio
 import base64
+import collections
+import contextlib
 import datetime
+import functools
 import hashlib
+import os
+import time
 import typing
 
-import aiohttp
-
-from mbbank.base import MBBankBase
+from mbbank.base import (
+    AdaptivePollInterval,
+    BackfillProgress,
+    BalanceGate,
+    BankDirectory,
+    HistoryWindows,
+    MBBankBase,
+    SeenSet,
+)
 from mbbank.capcha_ocr import CapchaProcessing
 from mbbank.encryption_backend import EncryptionBackend
 from mbbank.errors import (
@@ -22,12 +34,12 @@ from mbbank.modals import (
     ATMCardIDResponseModal,
     BalanceLoyaltyResponseModal,
     BalanceResponseModal,
-    Bank,
     BankListResponseModal,
     BeneficiaryListResponseModal,
     BulkPaymentDetailResponseModal,
     BulkPaymentStatusResponseModal,
     CardListResponseModal,
+    CardTransaction,
     CardTransactionsResponseModal,
     InterestRateResponseModal,
     LoanListResponseModal,
@@ -35,13 +47,62 @@ from mbbank.modals import (
     SavingDetailResponseModal,
     SavingListResponseModal,
     ServiceTokenResponseModal,
+    Transaction,
     TransactionHistoryResponseModal,
     UserInfoResponseModal,
 )
+from mbbank.session_store import SessionStore
+from mbbank.transaction_store import TransactionStore
+from mbbank.transport import AiohttpTransport, Transport
 
 from .bulk_transfer import BulkTransferContextAsync
 from .transfer import TransferContextAsync
 
+_F = typing.TypeVar("_F", bound=typing.Callable[..., typing.Awaitable[typing.Any]])
+_T = typing.TypeVar("_T")
+
+
+def _coalesce(func: _F) -> _F:
+    # share one upstream call and parsed result between identical concurrent read calls
+    @functools.wraps(func)
+    async def wrapper(self: "MBBankAsync", *args, **kwargs):
+        if not self.coalesce_requests:
+            return await func(self, *args, **kwargs)
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            task = self._inflight.get(key)
+        except TypeError:  # unhashable arguments can't be coalesced
+            return await func(self, *args, **kwargs)
+        if task is None:
+            task = asyncio.ensure_future(func(self, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._forget_inflight, key))
+        # shield so a cancelled caller doesn't cancel the call shared with the others
+        return await asyncio.shield(task)
+
+    return typing.cast(_F, wrapper)
+
+
+def _cached(func: _F) -> _F:
+    # serve responses from the cache for methods listed in cache_ttl, expired ones are refreshed in background
+    @functools.wraps(func)
+    async def wrapper(self: "MBBankAsync", *args, **kwargs):
+        key = self._cache_key(func.__name__, args, kwargs)
+        if key is None:
+            return await func(self, *args, **kwargs)
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry.fresh_until <= time.monotonic() and self._cache.begin_refresh(key):
+                task = asyncio.ensure_future(self._revalidate_cache(key, func, args, kwargs))
+                self._cache_tasks.add(task)
+                task.add_done_callback(self._cache_tasks.discard)
+            return entry.value
+        value = await func(self, *args, **kwargs)
+        self._cache.set(key, value, self.cache_ttl[func.__name__], self.cache_stale_ttl)
+        return value
+
+    return typing.cast(_F, wrapper)
+
 
 class MBBankAsync(MBBankBase):
     """Core Async class
@@ -49,15 +110,47 @@ class MBBankAsync(MBBankBase):
     Attributes:
         deviceIdCommon (str): Device id common
         sessionId (str or None): Current Session id
+        keepalive_error (Exception or None): error that stopped the background keep-alive
 
     Args:
         username (str): MBBank Account Username
         password (str): MBBank Account Password
         proxy (str, optional): Proxy url. Example: "http://127.0.0.1:8080". Defaults to None.
-        ocr_class (CapchaProcessing, optional): CapchaProcessing class. Defaults to CapchaOCR().
+        ocr_class (CapchaProcessing, optional): CapchaProcessing class. Defaults to CapchaOCR.shared() ( loaded once per process on the first capcha ).
         retry_times (int, optional): number of retry times for capcha processing. Defaults to 30 ( worst case ).
         timeout (Union[float, Tuple[float, float]], optional): request timeout in seconds or
         (connect timeout, read timeout) or None for no timeout. Defaults to None.
+        connector_limit (int, optional): maximum number of open connections per host session. Defaults to 100.
+        connector_limit_per_host (int, optional): maximum number of open connections to the same endpoint, 0 for no limit. Defaults to 0.
+        keepalive_timeout (float, optional): seconds an idle connection is kept in the pool for reuse. Defaults to 30.
+        transport (Transport, optional): http transport to send requests, when set proxy, timeout and connector options are ignored. Defaults to AiohttpTransport().
+        session_store (SessionStore, optional): store to save the session after login and restore it before doing a capcha login,
+        e.g. FileSessionStore to skip capcha login after restart or SQLiteSessionStore to share one session between processes. Defaults to None.
+        coalesce_requests (bool, optional): share one upstream call and parsed result between identical concurrent read calls
+        ( e.g. getBalance, getCardList, getTransactionAccountHistory ), transfers are never coalesced. Defaults to False.
+        prefetch_capcha (bool, optional): keep one capcha already solved in background so a login again costs a single login request. Defaults to False.
+        capcha_max_age (float, optional): seconds a prefetched capcha is considered valid. Defaults to 60.
+        capcha_min_confidence (float, optional): OCR confidence between 0 and 1 under which a new capcha is fetched
+        instead of trying to login with it, needs an `ocr_class` returning a confidence like CapchaOCR. Defaults to 0.
+        device_id (str, optional): device id common to use, when not set a new one is generated
+        or the one saved in `session_store` for this account is reused. Defaults to None.
+        cache_ttl (dict[str, float], optional): seconds the response of each read method is cached by method name,
+        merged over `MBBankBase.CACHE_TTL` ( bank list, interest rate and card list ), 0 to not cache a method.
+        Defaults to `MBBankBase.CACHE_TTL`.
+        cache_stale_ttl (float, optional): extra seconds an expired response is still returned while it's refreshed
+        in background ( stale-while-revalidate ). Defaults to 60.
+        cache_size (int, optional): maximum number of cached responses, least recently used are evicted first. Defaults to 256.
+        cache_dir (str or os.PathLike, optional): directory to persist reference data ( bank list, interest rate )
+        so a new process serve them without login, can be shared by accounts. Defaults to None.
+        disk_cache_ttl (dict[str, float], optional): seconds the response of each method is kept in `cache_dir`
+        by method name. Defaults to `MBBankBase.DISK_CACHE_TTL`.
+        prewarm_ocr (bool, optional): load and initialize the OCR model in a background thread right away,
+        a login meanwhile only waits for what is left of it. Defaults to False.
+        history_cache (bool, optional): fetch only the days missing when `getTransactionAccountHistory` is called
+        with overlapping ranges, today is refetched after `MBBankBase.HISTORY_CACHE_TODAY_TTL` seconds. Defaults to False.
+
+    Note: The default transport keeps one pooled `aiohttp.ClientSession` per host, use `async with MBBankAsync(...)`
+    or call `aclose()` when done to release the connections.
     """
 
     def __init__(
@@ -70,28 +163,154 @@ class MBBankAsync(MBBankBase):
         encryption_backend: typing.Optional[EncryptionBackend] = None,
         retry_times: int = 30,
         timeout: float | tuple[float, float] | None = None,
+        connector_limit: int = 100,
+        connector_limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        transport: typing.Optional[Transport] = None,
+        session_store: typing.Optional[SessionStore] = None,
+        coalesce_requests: bool = False,
+        prefetch_capcha: bool = False,
+        capcha_max_age: float = 60,
+        capcha_min_confidence: float = 0,
+        device_id: typing.Optional[str] = None,
+        cache_ttl: typing.Optional[dict[str, float]] = None,
+        cache_stale_ttl: float = 60,
+        cache_size: int = 256,
+        cache_dir: str | os.PathLike | None = None,
+        disk_cache_ttl: typing.Optional[dict[str, float]] = None,
+        history_cache: bool = False,
+        prewarm_ocr: bool = False,
     ):
+        if transport is None:
+            transport = AiohttpTransport(
+                proxy=proxy,
+                timeout=timeout,
+                connector_limit=connector_limit,
+                connector_limit_per_host=connector_limit_per_host,
+                keepalive_timeout=keepalive_timeout,
+            )
         super().__init__(
             username=username,
             password=password,
             ocr_class=ocr_class,
             encryption_backend=encryption_backend,
             retry_times=retry_times,
+            transport=transport,
+            session_store=session_store,
+            prefetch_capcha=prefetch_capcha,
+            capcha_max_age=capcha_max_age,
+            capcha_min_confidence=capcha_min_confidence,
+            device_id=device_id,
+            cache_ttl=cache_ttl,
+            cache_stale_ttl=cache_stale_ttl,
+            cache_size=cache_size,
+            cache_dir=cache_dir,
+            disk_cache_ttl=disk_cache_ttl,
+            history_cache=history_cache,
+            prewarm_ocr=prewarm_ocr,
         )
-        if proxy is not None:
-            self.proxy = proxy
-        else:
-            self.proxy = None
-        if timeout is not None:
-            if isinstance(timeout, tuple) and len(timeout) == 2:
-                self.timeout = aiohttp.ClientTimeout(connect=timeout[0], sock_read=timeout[1])
-            elif isinstance(timeout, (int, float)):
-                self.timeout = aiohttp.ClientTimeout(total=timeout)
-        else:
-            self.timeout = None
-
-    def _create_session(self) -> aiohttp.ClientSession:
-        return aiohttp.ClientSession(timeout=self.timeout)
+        self.coalesce_requests = coalesce_requests
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._cache_tasks: set[asyncio.Task] = set()
+        self._keepalive_task: typing.Optional[asyncio.Task] = None
+        self._capcha_task: typing.Optional[asyncio.Task] = None
+        self._capcha_lock: typing.Optional[asyncio.Lock] = None
+        # task holding _capcha_lock during a login, a login started again from it must not wait on the lock
+        self._capcha_owner: typing.Optional[asyncio.Task] = None
+        self._capcha_wakeup: typing.Optional[asyncio.Event] = None
+
+    def _forget_inflight(self, key: tuple, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved, every caller already got it through shield
+
+    async def _revalidate_cache(self, key: tuple, func: typing.Callable, args: tuple, kwargs: dict):
+        try:
+            # on error keep serving the stale response, the next call after it expires will raise the error
+            with contextlib.suppress(Exception):
+                value = await func(self, *args, **kwargs)
+                self._cache.set(key, value, self.cache_ttl[key[0]], self.cache_stale_ttl)
+        finally:
+            self._cache.end_refresh(key)
+
+    async def __aenter__(self) -> "MBBankAsync":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Close transport http sessions and stop background keep-alive,
+        the client can still be used after this and will open new sessions on demand
+        """
+        await self.stop_keepalive()
+        await self._stop_capcha_prefetch()
+        tasks = list(self._cache_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.transport.aclose()
+
+    def start_keepalive(
+        self, *, interval: float = 60, max_age: typing.Optional[float] = None, max_failures: typing.Optional[int] = 5
+    ):
+        """
+        Start an asyncio task in the running event loop that keeps the session alive so hot path calls
+        don't pay for a login, it sends a cheap request after `interval` seconds without any request
+        and logs in again ahead of expiry once the session is older than `max_age` seconds.
+
+        Args:
+            interval (float, optional): idle seconds before a keep-alive request. Defaults to 60.
+            max_age (float, optional): session age in seconds to proactively login again, None to only
+            login again when the server reject the session. Defaults to None.
+            max_failures (int, optional): consecutive failed keep-alive actions before it stops and saves the error
+            in `keepalive_error`, retries wait `interval` doubled after each failure. None to never stop. Defaults to 5.
+        """
+        if self._keepalive_task is not None and not self._keepalive_task.done():
+            return
+        self.keepalive_error = None
+        self._keepalive_task = asyncio.get_running_loop().create_task(
+            self._keepalive_loop(interval, max_age, max_failures)
+        )
+
+    async def stop_keepalive(self):
+        """
+        Stop background keep-alive started by `start_keepalive`
+        """
+        task = self._keepalive_task
+        self._keepalive_task = None
+        if task is None or task is asyncio.current_task():
+            return
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _keepalive_loop(
+        self, interval: float, max_age: typing.Optional[float], max_failures: typing.Optional[int]
+    ):
+        failures = 0
+        while True:
+            delay, action = self._next_keepalive_action(interval, max_age)
+            if action is None:
+                await asyncio.sleep(delay)
+                continue
+            # errors are not fatal here, the next hot path call will surface them
+            try:
+                if action == "refresh":
+                    await self._ensure_authenticated(self.sessionId)
+                else:
+                    await self._req(self.KEEPALIVE_PATH)
+            except Exception as e:
+                failures += 1
+                if max_failures is not None and failures >= max_failures:
+                    self.keepalive_error = e
+                    return
+                await asyncio.sleep(self._keepalive_retry_delay(interval, failures))
+                continue
+            failures = 0
+            await asyncio.sleep(min(interval, 1))
 
     async def get_capcha_image(self) -> bytes:
         """
@@ -110,17 +329,13 @@ class MBBankAsync(MBBankBase):
         headers["X-Request-Id"] = rid
         headers["Deviceid"] = self.deviceIdCommon
         headers["Refno"] = rid
-        async with (
-            self._create_session() as s,
-            s.post(
-                "https://online.mbbank.com.vn/api/retail-internetbankingms/getCaptchaImage",
-                headers=headers,
-                json=json_data,
-                proxy=self.proxy,
-            ) as r,
-        ):
-            data_out = await r.json()
-            return base64.b64decode(data_out["imageString"])
+        r = await self.transport.post_async(
+            "/api/retail-internetbankingms/getCaptchaImage",
+            headers=headers,
+            json=json_data,
+        )
+        data_out = r.json()
+        return base64.b64decode(data_out["imageString"])
 
     async def login(self, captcha_text: str):
         """
@@ -142,20 +357,17 @@ class MBBankAsync(MBBankBase):
             "ibAuthen2faString": self.FPR,
         }
         data_encrypt = await self.encryption_backend._encrypt_async(payload)
-        async with (
-            self._create_session() as s,
-            s.post(
-                "https://online.mbbank.com.vn/api/retail_web/internetbanking/v2.0/doLogin",
-                headers=self.HEADERS_DEFAULT,
-                json={"dataEnc": data_encrypt},
-                proxy=self.proxy,
-            ) as r,
-        ):
-            if r.status == 428:
-                raise CryptoVerifyError(await r.text(), r.content_type)
-            data_out = await r.json()
+        r = await self.transport.post_async(
+            "/api/retail_web/internetbanking/v2.0/doLogin",
+            headers=self.HEADERS_DEFAULT,
+            json={"dataEnc": data_encrypt},
+        )
+        if r.status == 428:
+            raise CryptoVerifyError(r.text, r.content_type)
+        data_out = r.json()
         if data_out["result"]["ok"]:
             self.sessionId = data_out["sessionId"]
+            self._session_created_at = time.time()
             data_out.pop("result", None)
             self._userinfo = data_out
             await self._verify_biometric_check()
@@ -163,36 +375,162 @@ class MBBankAsync(MBBankBase):
         raise MBBankAPIError(data_out["result"])
 
     async def _verify_biometric_check(self):
-        await self._req("https://online.mbbank.com.vn/api/retail-go-ekycms/v1.0/verify-biometric-nfc-transaction")
+        await self._req("/api/retail-go-ekycms/v1.0/verify-biometric-nfc-transaction")
+
+    async def _ensure_authenticated(self, stale_session_id: typing.Optional[str] = None):
+        # single-flight login, callers that waited on the lock reuse the session created by the first one
+        current_task = asyncio.current_task()
+        if self._async_auth_owner is not None and self._async_auth_owner is current_task:
+            # re-entered from inside login (biometric check), asyncio.Lock is not reentrant
+            await self._authenticate()
+            return
+        async with self._get_async_auth_lock():
+            if not self._need_authenticate(stale_session_id):
+                return
+            self._async_auth_owner = current_task
+            try:
+                if self.session_store is None:
+                    await self._authenticate()
+                else:
+                    await self._authenticate_shared(self.session_store, stale_session_id)
+            finally:
+                self._async_auth_owner = None
+
+    async def _authenticate_shared(self, store: SessionStore, stale_session_id: typing.Optional[str]):
+        # cross-process single-flight, the lease holder logs in and the others adopt the session it saves
+        if stale_session_id is not None:
+            await store.invalidate_async(self._userid, stale_session_id)
+        deadline = time.monotonic() + store.lease_ttl
+        while True:
+            if self._restore_session(await store.load_async(self._userid), stale_session_id):
+                return
+            if await store.acquire_lease_async(self._userid) or time.monotonic() > deadline:
+                break  # past the deadline the lease holder looks stuck, login by ourself
+            await asyncio.sleep(store.poll_interval)
+        try:
+            # the previous holder may have saved a session right before releasing the lease
+            if self._restore_session(await store.load_async(self._userid), stale_session_id):
+                return
+            # keep the device id of this account stable across restarts and processes
+            if self._adopt_device_id(await store.load_device_id_async(self._userid)):
+                await store.save_device_id_async(self._userid, self.deviceIdCommon)
+            await self._authenticate()
+            await store.save_async(self.export_session())
+        finally:
+            await store.release_lease_async(self._userid)
+
+    async def _solve_capcha(self, force: bool = False) -> typing.Optional[str]:
+        # None when the OCR is not confident enough, a new capcha is cheaper than a failed login
+        img_bytes = await self.get_capcha_image()
+        if self.capcha_min_confidence <= 0:
+            return await self.ocr_class.process_image_async(img_bytes)
+        text, confidence = await self.ocr_class.process_image_with_confidence_async(img_bytes)
+        return text if force or confidence >= self.capcha_min_confidence else None
+
+    def _start_capcha_prefetch(self) -> tuple[asyncio.Lock, asyncio.Event]:
+        if (
+            self._capcha_task is None
+            or self._capcha_task.done()
+            or self._capcha_lock is None
+            or self._capcha_wakeup is None
+        ):
+            # created here to bind them to the running event loop
+            self._capcha_lock = asyncio.Lock()
+            self._capcha_wakeup = asyncio.Event()
+            self._capcha_task = asyncio.get_running_loop().create_task(
+                self._capcha_prefetch_loop(self._capcha_lock, self._capcha_wakeup)
+            )
+        return self._capcha_lock, self._capcha_wakeup
+
+    async def _stop_capcha_prefetch(self):
+        task = self._capcha_task
+        self._capcha_task = None
+        if task is None:
+            return
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _capcha_prefetch_loop(self, lock: asyncio.Lock, wakeup: asyncio.Event):
+        while True:
+            wakeup.clear()
+            delay = self._capcha_refill_delay()
+            if delay > 0:
+                # sleep until the buffered capcha gets old or is taken by a login
+                # ( asyncio.wait instead of wait_for which can swallow a cancel on python < 3.12 )
+                waiter = asyncio.ensure_future(wakeup.wait())
+                try:
+                    await asyncio.wait([waiter], timeout=delay)
+                finally:
+                    waiter.cancel()
+                continue
+            try:
+                async with lock:
+                    text = None
+                    if self._capcha_refill_delay() == 0:
+                        text = await self._solve_capcha()
+                        if text is not None:
+                            self._capcha_buffer = (text, time.monotonic())
+                if text is None:
+                    await asyncio.sleep(1)  # low confidence, don't hammer the capcha endpoint
+            except Exception:
+                await asyncio.sleep(min(self.capcha_max_age, 5))  # retry later, login fetch capcha itself meanwhile
+
+    async def _login_with_new_capcha(self, force: bool = False) -> bool:
+        text = await self._solve_capcha(force)
+        if text is None:
+            return False  # low confidence, fetch another capcha
+        await self.login(text)
+        return True
+
+    async def _login_with_prefetched_capcha(self, force: bool = False) -> bool:
+        if self._capcha_owner is not None and self._capcha_owner is asyncio.current_task():
+            # login again from inside the login holding the lock ( e.g. GW200 on the biometric check )
+            return await self._login_with_new_capcha(force)
+        lock, wakeup = self._start_capcha_prefetch()
+        # hold the lock during login, fetching a new capcha may invalidate the one being submitted
+        async with lock:
+            self._capcha_owner = asyncio.current_task()
+            try:
+                text = self._take_prefetched_capcha()
+                if text is None:
+                    return await self._login_with_new_capcha(force)
+                await self.login(text)
+                return True
+            finally:
+                self._capcha_owner = None
+                wakeup.set()  # buffer is empty, refill it in background
 
     async def _authenticate(self):
         try_count = 0
         while try_count < self.retry_times:
             try_count += 1
-            self._userinfo = None
-            self.sessionId = None
-            img_bytes = await self.get_capcha_image()
-            text = await self.ocr_class.process_image_async(img_bytes)
+            # keep the current session until the new one is set so other callers are not blocked by a refresh
+            # the last try is submitted even when the OCR is not confident
+            force = try_count >= self.retry_times
+            login = self._login_with_prefetched_capcha if self.prefetch_capcha else self._login_with_new_capcha
             try:
-                await self.login(text)
-                return
+                if await login(force):
+                    return
             except MBBankAPIError as e:
                 if e.code == "GW283":
                     continue  # capcha error, try again
                 raise e
         raise CapchaError(f"Exceeded maximum retry times for capcha processing ({self.retry_times})")
 
-    async def _req(self, url, *, json=None, headers=None, encrypt: bool = False) -> dict[str, typing.Any]:
+    async def _req(self, path, *, json=None, headers=None, encrypt: bool = False) -> dict[str, typing.Any]:
         if headers is None:
             headers = {}
         if json is None:
             json = {}
         while True:
-            if self.sessionId is None:
-                await self._authenticate()
+            session_id = self.sessionId
+            if session_id is None:
+                await self._ensure_authenticated()
+                session_id = self.sessionId
             rid = f"{self._userid}-{self._get_now_time()}"
             json_data = {
-                "sessionId": self.sessionId if self.sessionId is not None else "",
+                "sessionId": session_id if session_id is not None else "",
                 "refNo": rid,
                 "deviceIdCommon": self.deviceIdCommon,
             }
@@ -204,31 +542,90 @@ class MBBankAsync(MBBankBase):
             if encrypt:
                 data_encrypt = await self.encryption_backend._encrypt_async(json_data)
                 json_data = {"dataEnc": data_encrypt}
-            async with (
-                self._create_session() as s,
-                s.post(
-                    url,
-                    headers=headers,
-                    json=json_data,
-                    proxy=self.proxy,
-                    timeout=self.timeout,
-                ) as r,
-            ):
-                if r.status == 428:
-                    raise CryptoVerifyError(await r.text(), r.content_type)
-                data_out = await r.json()
+            r = await self.transport.post_async(path, headers=headers, json=json_data)
+            if r.status == 428:
+                raise CryptoVerifyError(r.text, r.content_type)
+            data_out = r.json()
             if data_out["result"] is None:
-                await self.getBalance()
+                await self._fetch_balance()
             # Some endpoints return {"result": {"ok": true}}, others return {"result": {"result": true}}
             elif data_out["result"].get("ok", False) or data_out["result"].get("result", False):
                 data_out.pop("result", None)
+                self._last_request_at = time.time()
                 break
             elif data_out["result"]["responseCode"] == "GW200":
-                await self._authenticate()
+                await self._ensure_authenticated(session_id)
             else:
                 raise MBBankAPIError(data_out["result"])
         return data_out
 
+    async def _iter_history(
+        self,
+        fetch: typing.Callable[[datetime.datetime, datetime.datetime], typing.Awaitable[list[_T]]],
+        windows: HistoryWindows,
+        concurrency: int,
+    ) -> typing.AsyncIterator[_T]:
+        seen: set[str] = set()
+        async for _, transactions in self._iter_history_windows(fetch, windows, concurrency):
+            for transaction in self._dedupe_transactions(transactions, seen):
+                yield transaction
+
+    async def _iter_history_windows(
+        self,
+        fetch: typing.Callable[[datetime.datetime, datetime.datetime], typing.Awaitable[list[_T]]],
+        windows: HistoryWindows,
+        concurrency: int,
+    ) -> typing.AsyncIterator[tuple[tuple[datetime.date, datetime.date], list[_T]]]:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_window(window: tuple[datetime.date, datetime.date]) -> list[_T]:
+            start, end = (datetime.datetime.combine(day, datetime.time()) for day in window)
+            async with semaphore:
+                return await fetch(start, end)
+
+        # windows in planning order with their pending fetch, results are yielded in this order
+        slots: collections.deque[tuple[tuple[datetime.date, datetime.date], asyncio.Task]] = collections.deque()
+        try:
+            while True:
+                while len(slots) < concurrency:
+                    window = windows.next()
+                    if window is None:
+                        break
+                    slots.append((window, asyncio.ensure_future(fetch_window(window))))
+                if not slots:
+                    return
+                window, task = slots.popleft()
+                try:
+                    transactions = await task
+                except self.transport.TIMEOUT_ERRORS:
+                    halves = windows.split(window)
+                    if halves is None:
+                        raise
+                    slots.extendleft((half, asyncio.ensure_future(fetch_window(half))) for half in reversed(halves))
+                    continue
+                windows.observe(window, len(transactions))
+                yield window, transactions
+        finally:
+            tasks = [task for _, task in slots]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _req_reference(self, endpoint: str, path: str, *, json=None) -> dict[str, typing.Any]:
+        # reference data is looked up in cache_dir before any request ( and so before login )
+        disk_cache, ttl = self._disk_cache, self.disk_cache_ttl.get(endpoint)
+        if disk_cache is None or not ttl:
+            return await self._req(path, json=json)
+        data_out = await asyncio.to_thread(disk_cache.load, endpoint, json)
+        if data_out is None:
+            data_out = await self._req(path, json=json)
+            await asyncio.to_thread(disk_cache.save, endpoint, json, data_out, ttl)
+        return data_out
+
+    @_cached
+    @_coalesce
     async def getTransactionAccountHistory(
         self,
         *,
@@ -250,19 +647,264 @@ class MBBankAsync(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
+        if self._history_cache is None:
+            return await self._fetch_transaction_history(accountNo, from_date, to_date)
+        account_no = self._userid if accountNo is None else accountNo
+        for start, end in self._history_cache.missing(account_no, from_date.date(), to_date.date()):
+            history = await self._fetch_transaction_history(
+                account_no,
+                datetime.datetime.combine(start, datetime.time()),
+                datetime.datetime.combine(end, datetime.time()),
+            )
+            self._history_cache.put(account_no, start, end, history)
+        cached = self._history_cache.get(account_no, from_date.date(), to_date.date())
+        if cached is None:  # invalidated meanwhile
+            return await self._fetch_transaction_history(account_no, from_date, to_date)
+        return cached
+
+    async def _fetch_transaction_history(
+        self, accountNo: typing.Optional[str], from_date: datetime.datetime, to_date: datetime.datetime
+    ) -> TransactionHistoryResponseModal:
         if self._userinfo is None:
-            await self._authenticate()
+            await self._ensure_authenticated()
         json_data = {
             "accountNo": self._userid if accountNo is None else accountNo,
             "fromDate": from_date.strftime("%d/%m/%Y"),
             "toDate": to_date.strftime("%d/%m/%Y"),  # max 3 months
         }
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail-transactionms/transactionms/get-account-transaction-history",
+            "/api/retail-transactionms/transactionms/get-account-transaction-history",
             json=json_data,
         )
         return TransactionHistoryResponseModal.model_validate(data_out, strict=True)
 
+    async def iterTransactionHistory(
+        self,
+        *,
+        accountNo: typing.Optional[str] = None,
+        from_date: datetime.datetime,
+        to_date: datetime.datetime,
+        window: int = 30,
+        concurrency: int = 4,
+    ) -> typing.AsyncIterator[Transaction]:
+        """
+        Iterate account transaction history of any date range, the range is split in windows the server accept
+        which are fetched concurrently, transactions are yielded window by window from `from_date` to `to_date`
+        as soon as a window and the ones before it are fetched.
+
+        Windows get smaller when a response is large ( `HISTORY_SHRINK_AT` ) and a window that timed out is split
+        in two, transactions returned by more than one window are yielded once ( by refNo ).
+
+        Args:
+            accountNo (str, optional): Sub account number Defaults to Main Account number.
+            from_date (datetime.datetime): transaction from date
+            to_date (datetime.datetime): transaction to date
+            window (int, optional): days per request, max `MAX_HISTORY_WINDOW`. Defaults to 30.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+
+        Yields:
+            success (Transaction): transaction
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+
+        async def fetch(start: datetime.datetime, end: datetime.datetime) -> list[Transaction]:
+            history = await self.getTransactionAccountHistory(accountNo=accountNo, from_date=start, to_date=end)
+            return history.transactionHistoryList
+
+        async for transaction in self._iter_history(
+            fetch, self._history_windows(from_date, to_date, window), concurrency
+        ):
+            yield transaction
+
+    async def syncTransactions(
+        self,
+        store: TransactionStore,
+        *,
+        accountNo: typing.Optional[str] = None,
+        from_date: typing.Optional[datetime.datetime] = None,
+        overlap: datetime.timedelta = datetime.timedelta(days=1),
+        window: int = 30,
+        concurrency: int = 4,
+    ) -> int:
+        """
+        Sync account transactions into a local store, only the days since the last sync ( the store watermark )
+        are fetched again with a small overlap for transactions posted late, then query the store without api calls.
+
+        Args:
+            store (TransactionStore): local store, e.g. SQLiteTransactionStore
+            accountNo (str, optional): Sub account number Defaults to Main Account number.
+            from_date (datetime.datetime, optional): first day to fetch when the account was never synced.
+            Defaults to `MAX_HISTORY_WINDOW` days ago.
+            overlap (datetime.timedelta, optional): time fetched again before the watermark. Defaults to 1 day.
+            window (int, optional): days per request. Defaults to 30.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+
+        Returns:
+            success (int): number of transactions inserted or changed in the store
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+        account_no = self._userid if accountNo is None else accountNo
+        start, end = self._transaction_sync_range(
+            store, await store.get_watermark_async(account_no), from_date, overlap
+        )
+        transactions = [
+            transaction
+            async for transaction in self.iterTransactionHistory(
+                accountNo=account_no, from_date=start, to_date=end, window=window, concurrency=concurrency
+            )
+        ]
+        return await store.save_transactions_async(account_no, transactions, end.date())
+
+    async def backfillTransactions(
+        self,
+        store: TransactionStore,
+        *,
+        accountNo: typing.Optional[str] = None,
+        from_date: datetime.datetime,
+        to_date: typing.Optional[datetime.datetime] = None,
+        window: int = 90,
+        concurrency: int = 4,
+        progress: typing.Optional[typing.Callable[[BackfillProgress], typing.Any]] = None,
+    ) -> BackfillProgress:
+        """
+        Backfill account history into a store, walking back from `to_date` to `from_date` window by window
+        with bounded concurrency, each window is saved with a checkpoint so a new call resume where the last one stopped.
+
+        Args:
+            store (TransactionStore): sink saving transactions and checkpoints, e.g. SQLiteTransactionStore
+            accountNo (str, optional): Sub account number Defaults to Main Account number.
+            from_date (datetime.datetime): oldest day to backfill, a day older than the checkpoint one extends the backfill
+            to_date (datetime.datetime, optional): newest day to backfill, ignored when resuming. Defaults to now.
+            window (int, optional): days per request, max `MAX_HISTORY_WINDOW`. Defaults to 90.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+            progress (Callable[[BackfillProgress], Any], optional): called after each saved window. Defaults to None.
+
+        Returns:
+            success (BackfillProgress): final progress, `finished` is True when every day is saved
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+        account_no = self._userid if accountNo is None else accountNo
+        checkpoint, windows = self._backfill_start(
+            store, await store.load_backfill_checkpoint_async(account_no), account_no, from_date, to_date, window
+        )
+        started = time.monotonic()
+        report = self._backfill_progress(checkpoint, 0, 0, started)
+        if windows is None:
+            return report
+
+        async def fetch(start: datetime.datetime, end: datetime.datetime) -> list[Transaction]:
+            return (await self._fetch_transaction_history(account_no, start, end)).transactionHistoryList
+
+        # windows come back newest first, so the oldest saved day only moves back over fully saved days
+        async for (start, _), transactions in self._iter_history_windows(fetch, windows, concurrency):
+            checkpoint = checkpoint.model_copy(
+                update={
+                    "done_until": start,
+                    "transactions": checkpoint.transactions + len(transactions),
+                    "timestamp": time.time(),
+                }
+            )
+            await store.save_backfill_window_async(account_no, transactions, checkpoint)
+            report = self._backfill_progress(
+                checkpoint, report.windows + 1, report.transactions + len(transactions), started
+            )
+            if progress is not None:
+                progress(report)
+        return report
+
+    async def watchTransactions(
+        self,
+        *,
+        accountNo: str | list[str] | None = None,
+        balance_gated: bool = False,
+        min_interval: float = 5,
+        max_interval: float = 60,
+        seen_size: int = 10000,
+        skip_existing: bool = True,
+        max_errors: int = 10,
+    ) -> typing.AsyncIterator[Transaction]:
+        """
+        Watch new account transactions ( e.g. incoming payments ), yield them forever until the loop is broken
+
+        Poll the shortest window ( today, and yesterday right after midnight ), the poll interval goes back to
+        `min_interval` when a new transaction arrives, grows toward `max_interval` while idle and backs off on errors.
+        Expired sessions are renewed like any other call, other errors are retried until `max_errors` in a row.
+
+        With `balance_gated` each tick only calls `getBalance` and fetches the history of the accounts whose
+        balance changed, without `accountNo` it watches the username account if `getBalance` lists it or else
+        the default account of the user, accounts not listed by `getBalance` are always fetched.
+
+        Args:
+            accountNo (str or list[str], optional): account numbers to watch. Defaults to Main Account number.
+            balance_gated (bool, optional): poll balances and fetch history only for accounts that changed. Defaults to False.
+            min_interval (float, optional): shortest seconds between polls. Defaults to 5.
+            max_interval (float, optional): longest seconds between polls. Defaults to 60.
+            seen_size (int, optional): number of recent refNo remembered to skip already reported transactions. Defaults to 10000.
+            skip_existing (bool, optional): don't report transactions already there at the first poll. Defaults to True.
+            max_errors (int, optional): consecutive failed polls before the error is raised. Defaults to 10.
+
+        Yields:
+            success (Transaction): new transaction, oldest first
+
+        Raises:
+            MBBankAPIError: if api response not ok `max_errors` times in a row
+        """
+        accounts = self._watch_accounts(accountNo)
+        poll = AdaptivePollInterval(min_interval, max_interval)
+        seen = SeenSet(seen_size)
+        gate = BalanceGate() if balance_gated else None
+        last_days: dict[str, datetime.date] = {}
+        while True:
+            try:
+                due = accounts
+                if gate is not None:
+                    balance = await self._fetch_balance()
+                    if accountNo is None:
+                        accounts = [self._watch_default_account(balance)]
+                    due = gate.due(accounts, {account.acctNo: account.currentBalance for account in balance.acct_list})
+                windows = [(account, *self._watch_window(last_days.get(account))) for account in due]
+                # watch the latest transactions, bypassing response and history caches
+                histories = await asyncio.gather(
+                    *(
+                        self._fetch_transaction_history(account, from_date, to_date)
+                        for account, from_date, to_date in windows
+                    )
+                )
+            except Exception:
+                delay = poll.on_error()
+                if poll.errors >= max_errors:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            new = self._watch_collect(
+                [
+                    (account, to_date, history.transactionHistoryList)
+                    for (account, _, to_date), history in zip(windows, histories, strict=True)
+                ],
+                seen,
+                last_days,
+                skip_existing,
+                gate,
+            )
+            for transaction in new:
+                yield transaction
+            await asyncio.sleep(poll.on_result(len(new)))
+
+    async def _fetch_balance(self) -> BalanceResponseModal:
+        # not cached nor coalesced, _req also calls it to check the session from inside a coalesced getBalance
+        if self._userinfo is None:
+            await self._ensure_authenticated()
+        data_out = await self._req("/api/retail-accountms/accountms/getBalance")
+        return BalanceResponseModal.model_validate(data_out, strict=True)
+
+    @_cached
+    @_coalesce
     async def getBalance(self) -> BalanceResponseModal:
         """
         Get all main account and subaccount balance
@@ -273,11 +915,10 @@ class MBBankAsync(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        if self._userinfo is None:
-            await self._authenticate()
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail-accountms/accountms/getBalance")
-        return BalanceResponseModal.model_validate(data_out, strict=True)
+        return await self._fetch_balance()
 
+    @_cached
+    @_coalesce
     async def getBalanceLoyalty(self) -> BalanceLoyaltyResponseModal:
         """
         Get Account loyalty rank and Member loyalty point
@@ -288,9 +929,11 @@ class MBBankAsync(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail_web/loyalty/getBalanceLoyalty")
+        data_out = await self._req("/api/retail_web/loyalty/getBalanceLoyalty")
         return BalanceLoyaltyResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getInterestRate(self, currency: str = "VND") -> InterestRateResponseModal:
         """
         Get saving interest rate
@@ -305,12 +948,15 @@ class MBBankAsync(MBBankBase):
             MBBankAPIError: if api response not ok
         """
         json_data = {"productCode": "TIENGUI.KHN.EMB", "currency": currency}
-        data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/saving/getInterestRate",
+        data_out = await self._req_reference(
+            "getInterestRate",
+            "/api/retail_web/saving/getInterestRate",
             json=json_data,
         )
         return InterestRateResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getFavorBeneficiaryList(
         self,
         *,
@@ -332,11 +978,13 @@ class MBBankAsync(MBBankBase):
         """
         json_data = {"transactionType": transactionType, "searchType": searchType}
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/internetbanking/getFavorBeneficiaryList",
+            "/api/retail_web/internetbanking/getFavorBeneficiaryList",
             json=json_data,
         )
         return BeneficiaryListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getCardList(self) -> CardListResponseModal:
         """
         Get all card list from your account
@@ -347,9 +995,11 @@ class MBBankAsync(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail_web/card/getList")
+        data_out = await self._req("/api/retail_web/card/getList")
         return CardListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getSavingList(self) -> SavingListResponseModal:
         """
         Get all saving list from your account
@@ -360,9 +1010,11 @@ class MBBankAsync(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail-savingms/saving/v3.0/getList")
+        data_out = await self._req("/api/retail-savingms/saving/v3.0/getList")
         return SavingListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getSavingDetail(self, accNo: str, accType: typing.Literal["OSA", "SBA"]) -> SavingDetailResponseModal:
         """
         Get saving detail by account number
@@ -379,11 +1031,13 @@ class MBBankAsync(MBBankBase):
         """
         json_data = {"accNo": accNo, "accType": accType}
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/saving/getDetail",
+            "/api/retail_web/saving/getDetail",
             json=json_data,
         )
         return SavingDetailResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getLoanList(self) -> LoanListResponseModal:
         """
         Get all loan list from your account
@@ -394,9 +1048,11 @@ class MBBankAsync(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail-onlineloanms/loan/getList")
+        data_out = await self._req("/api/retail-onlineloanms/loan/getList")
         return LoanListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getCardTransactionHistory(
         self, cardNo: str, from_date: datetime.datetime, to_date: datetime.datetime
     ) -> CardTransactionsResponseModal:
@@ -423,11 +1079,47 @@ class MBBankAsync(MBBankBase):
             "type": "CARD",
         }
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/common/getTransactionHistory",
+            "/api/retail_web/common/getTransactionHistory",
             json=json_data,
         )
         return CardTransactionsResponseModal.model_validate(data_out, strict=True)
 
+    async def iterCardTransactionHistory(
+        self,
+        cardNo: str,
+        from_date: datetime.datetime,
+        to_date: datetime.datetime,
+        *,
+        window: int = 30,
+        concurrency: int = 4,
+    ) -> typing.AsyncIterator[CardTransaction]:
+        """
+        Iterate card transaction history of any date range, see `iterTransactionHistory` for how the range is fetched
+
+        Args:
+            cardNo (str): card number get from getCardList
+            from_date (datetime.datetime): from date
+            to_date (datetime.datetime): to date
+            window (int, optional): days per request, max `MAX_HISTORY_WINDOW`. Defaults to 30.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+
+        Yields:
+            success (CardTransaction): card transaction
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+
+        async def fetch(start: datetime.datetime, end: datetime.datetime) -> list[CardTransaction]:
+            return (await self.getCardTransactionHistory(cardNo, start, end)).transactionHistoryList
+
+        async for transaction in self._iter_history(
+            fetch, self._history_windows(from_date, to_date, window), concurrency
+        ):
+            yield transaction
+
+    @_cached
+    @_coalesce
     async def getBankList(self) -> BankListResponseModal:
         """
         Get transfer all bank list
@@ -438,13 +1130,29 @@ class MBBankAsync(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        # use cache as bank list doesn't change often (mirror sync behavior)
-        if "bank_list" in self._temp:
-            return BankListResponseModal.model_validate(self._temp["bank_list"], strict=True)
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail_web/common/getBankList")
-        self._temp["bank_list"] = data_out
-        return BankListResponseModal.model_validate(data_out, strict=True)
+        data_out = await self._req_reference("getBankList", "/api/retail_web/common/getBankList")
+        bank_list = BankListResponseModal.model_validate(data_out, strict=True)
+        self._update_bank_directory(bank_list)
+        return bank_list
+
+    async def getBankDirectory(self) -> BankDirectory:
+        """
+        Get bank list indexed for fast lookup by bank code, sml code, citad code and card number,
+        indexes are built once and reused until `getBankList` returns different banks
+        or `invalidate_cache("getBankList")` is called
+
+        Returns:
+            success (BankDirectory): indexed bank list
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+        if self._bank_directory is not None:
+            return self._bank_directory
+        return self._get_bank_directory(await self.getBankList())
 
+    @_cached
+    @_coalesce
     async def getAccountByPhone(self, phone: str) -> AccountByPhoneResponseModal:
         """
         Get transfer account info by phone (MBank internal account only)
@@ -459,11 +1167,13 @@ class MBBankAsync(MBBankBase):
         """
         json_data = {"phone": phone}
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/common/getAccountByPhone",
+            "/api/retail_web/common/getAccountByPhone",
             json=json_data,
         )
         return AccountByPhoneResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getServiceToken(self) -> ServiceTokenResponseModal:
         """
         Get service token for external service usage
@@ -472,10 +1182,12 @@ class MBBankAsync(MBBankBase):
             success (ServiceTokenResponseModal): service token
         """
         if self._userinfo is None:
-            await self._authenticate()
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail_web/common/getServiceToken")
+            await self._ensure_authenticated()
+        data_out = await self._req("/api/retail_web/common/getServiceToken")
         return ServiceTokenResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getSavedBeneficiary(self) -> SavedBeneficiaryListResponseModal:
         """
         Get all saved beneficiary list from your account.
@@ -487,11 +1199,13 @@ class MBBankAsync(MBBankBase):
         """
         json_data = {"type": "TRANSFER"}
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/common/getBeneficiary",
+            "/api/retail_web/common/getBeneficiary",
             json=json_data,
         )
         return SavedBeneficiaryListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getAccountName(self, accountNo: str, bankCode: str, debitAccount: str) -> AccountNameResponseModal:
         """
         Get account name by account number
@@ -515,7 +1229,7 @@ class MBBankAsync(MBBankBase):
             "remark": "",
         }
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/v1.0/inquiry-account-name",
+            "/api/retail_web/transfer/v1.0/inquiry-account-name",
             json=json_data,
         )
         return AccountNameResponseModal.model_validate(data_out, strict=True)
@@ -540,17 +1254,13 @@ class MBBankAsync(MBBankBase):
             "cardNumber": cardNumber,
             "requestID": f"{self._userid}-{self._get_now_time()}",
         }
-        async with (
-            self._create_session() as s,
-            s.post(
-                "https://mbcard.mbbank.com.vn:8446/mbcardgw/internet/cardinfo/v1_0/generateid",
-                headers=headers,
-                json=json_data,
-                proxy=self.proxy,
-                timeout=self.timeout,
-            ) as r,
-        ):
-            data_out = await r.json()
+        r = await self.transport.post_async(
+            "/mbcardgw/internet/cardinfo/v1_0/generateid",
+            headers=headers,
+            json=json_data,
+            host="card",
+        )
+        data_out = r.json()
         return ATMCardIDResponseModal.model_validate(data_out, strict=True)
 
     async def getATMAccountName(self, cardNumber: str, debitAccount: str) -> ATMAccountNameResponseModal:
@@ -575,12 +1285,7 @@ class MBBankAsync(MBBankBase):
                     "message": card_id.errorInfo.message,
                 }
             )
-        bank_list = await self.getBankList()
-        bank_info: typing.Optional[Bank] = None
-        for bank in bank_list.listBank:
-            if cardNumber.startswith(bank.smlCode):
-                bank_info = bank
-                break
+        bank_info = (await self.getBankDirectory()).by_card_number(cardNumber)
         if bank_info is None:
             raise BankNotFoundError("ATM Card Bank not found in bank list")
         json_data = {
@@ -593,7 +1298,7 @@ class MBBankAsync(MBBankBase):
             "remark": "",
         }
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/inquiryAccountName",
+            "/api/retail_web/transfer/inquiryAccountName",
             json=json_data,
         )
         return ATMAccountNameResponseModal.model_validate(data_out, strict=True)
@@ -609,7 +1314,7 @@ class MBBankAsync(MBBankBase):
             MBBankAPIError: if api response not ok
         """
         if self._userinfo is None:
-            await self._authenticate()
+            await self._ensure_authenticated()
         return UserInfoResponseModal.model_validate(self._userinfo, strict=True)
 
     async def makeBulkTransfer(
@@ -641,14 +1346,18 @@ class MBBankAsync(MBBankBase):
         )
         return await context.start()
 
+    @_cached
+    @_coalesce
     async def getBulkPaymentStatus(self) -> BulkPaymentStatusResponseModal:
-        data_out = await self._req("https://online.mbbank.com.vn/api/retail-bulkpaymentms/getBulkPaymentStatus")
+        data_out = await self._req("/api/retail-bulkpaymentms/getBulkPaymentStatus")
         return BulkPaymentStatusResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
+    @_coalesce
     async def getBulkPaymentDetail(self, bulk_id: str) -> BulkPaymentDetailResponseModal:
         json_data = {"bulkId": bulk_id}
         data_out = await self._req(
-            "https://online.mbbank.com.vn/api/retail-bulkpaymentms/getBulkPaymentDetail",
+            "/api/retail-bulkpaymentms/getBulkPaymentDetail",
             json=json_data,
         )
         return BulkPaymentDetailResponseModal.model_validate(data_out, strict=True)
@@ -75,11 +75,10 @@ class TransferContextAsync(TransferContextBase):
         """
         if self.bank is not None:
             return self.bank
-        bank_list = await self.mbbank.getBankList()
-        for bank in bank_list.listBank:
-            if bank.bankCode == self.bank_code:
-                self.bank = bank
-                return bank
+        bank = (await self.mbbank.getBankDirectory()).by_bank_code(self.bank_code)
+        if bank is not None:
+            self.bank = bank
+            return bank
         raise BankNotFoundError("Bank code not found in bank list")
 
     async def verify_transfer(self) -> TransferResponseModal:
@@ -109,7 +108,7 @@ class TransferContextAsync(TransferContextBase):
             "otp": "",
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/v1.0/verify-make-transfer",
+            "/api/retail_web/transfer/v1.0/verify-make-transfer",
             json=json_data,
             encrypt=True,
         )
@@ -134,7 +133,7 @@ class TransferContextAsync(TransferContextBase):
             "serviceCode": f"GCM_FTR_DOM_{self.bank.typeTransfer}",
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/internetbanking/getAuthList",
+            "/api/retail_web/internetbanking/getAuthList",
             json=json_data,
             encrypt=True,
         )
@@ -169,7 +168,7 @@ class TransferContextAsync(TransferContextBase):
             }
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/vtap/createTransactionAuthen",
+            "/api/retail_web/vtap/createTransactionAuthen",
             json=json_data,
             encrypt=True,
         )
@@ -207,7 +206,7 @@ class TransferContextAsync(TransferContextBase):
             "otp": otp_crafted,
         }
         data_out = await self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/v1.0/make-transfer",
+            "/api/retail_web/transfer/v1.0/make-transfer",
             json=json_data,
             encrypt=True,
         )
@@ -1,4 +1,21 @@
+from .bank_directory import BankDirectory
+from .history import BackfillProgress, HistoryWindows
 from .mbbank import MBBankBase
+from .request_id import RequestIdGenerator, request_id_generator
 from .transfer import BaseTransferContext, BulkTransferContextBase, TransferContextBase
+from .watch import AdaptivePollInterval, BalanceGate, SeenSet
 
-__all__ = ["BaseTransferContext", "BulkTransferContextBase", "MBBankBase", "TransferContextBase"]
+__all__ = [
+    "AdaptivePollInterval",
+    "BackfillProgress",
+    "BalanceGate",
+    "BankDirectory",
+    "BaseTransferContext",
+    "BulkTransferContextBase",
+    "HistoryWindows",
+    "MBBankBase",
+    "RequestIdGenerator",
+    "SeenSet",
+    "TransferContextBase",
+    "request_id_generator",
+]
@@ -0,0 +1,110 @@
+import typing
+
+from mbbank.modals import Bank, BankListResponseModal
+
+
+class _TrieNode:
+    __slots__ = ("bank", "children")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.bank: typing.Optional[Bank] = None
+
+
+class BankDirectory:
+    """
+    Bank list indexed by bank code, sml code and citad code with a prefix trie of card BINs,
+    build once from `getBankList()` and reuse for every lookup.
+
+    When several banks share a code the first one in the bank list is kept, same as scanning the list.
+
+    Args:
+        bank_list (BankListResponseModal): bank list response
+
+    Attributes:
+        banks (list[Bank]): all banks in bank list order
+    """
+
+    def __init__(self, bank_list: BankListResponseModal):
+        self.banks: list[Bank] = list(bank_list.listBank)
+        self._by_bank_code: dict[str, Bank] = {}
+        self._by_sml_code: dict[str, Bank] = {}
+        self._by_citad_code: dict[str, Bank] = {}
+        self._bin_trie = _TrieNode()
+        for bank in self.banks:
+            self._by_bank_code.setdefault(bank.bankCode, bank)
+            self._by_sml_code.setdefault(bank.smlCode, bank)
+            if bank.citadCode:
+                self._by_citad_code.setdefault(bank.citadCode, bank)
+            # card numbers start with the bank BIN which is the bank sml code
+            node = self._bin_trie
+            for char in bank.smlCode:
+                node = node.children.setdefault(char, _TrieNode())
+            if node.bank is None:
+                node.bank = bank
+
+    def __len__(self) -> int:
+        return len(self.banks)
+
+    def __iter__(self) -> typing.Iterator[Bank]:
+        return iter(self.banks)
+
+    def by_bank_code(self, bank_code: str) -> typing.Optional[Bank]:
+        """
+        Find bank by bank code
+
+        Args:
+            bank_code (str): bank code, e.g. "MB"
+
+        Returns:
+            success (Bank or None): bank info or None if not found
+        """
+        return self._by_bank_code.get(bank_code)
+
+    def by_sml_code(self, sml_code: str) -> typing.Optional[Bank]:
+        """
+        Find bank by sml code
+
+        Args:
+            sml_code (str): sml code
+
+        Returns:
+            success (Bank or None): bank info or None if not found
+        """
+        return self._by_sml_code.get(sml_code)
+
+    def by_citad_code(self, citad_code: str) -> typing.Optional[Bank]:
+        """
+        Find bank by citad code
+
+        Args:
+            citad_code (str): citad code
+
+        Returns:
+            success (Bank or None): bank info or None if not found
+        """
+        return self._by_citad_code.get(citad_code)
+
+    def by_card_number(self, card_number: str) -> typing.Optional[Bank]:
+        """
+        Find issuer bank of a card by the longest matching BIN prefix
+
+        Args:
+            card_number (str): card number
+
+        Returns:
+            success (Bank or None): bank info or None if not found
+        """
+        node = self._bin_trie
+        found = node.bank
+        for char in card_number:
+            child = node.children.get(char)
+            if child is None:
+                break
+            node = child
+            if node.bank is not None:
+                found = node.bank
+        return found
+
+
+__all__ = ["BankDirectory"]
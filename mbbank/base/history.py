@@ -0,0 +1,132 @@
+import datetime
+import typing
+
+
+class HistoryWindows:
+    """
+    Split a transaction history date range into windows the server accepts,
+    windows are consecutive and don't overlap, both ends of a window are included.
+
+    The window size shrinks by half for the windows not planned yet when a response is large,
+    a window that timed out can be split in two smaller windows.
+
+    Args:
+        from_date (datetime.date): first day of the range
+        to_date (datetime.date): last day of the range
+        window (int): days per window
+        shrink_at (int): number of transactions in a response that makes next windows smaller
+        backward (bool, optional): plan windows from `to_date` back to `from_date`. Defaults to False.
+    """
+
+    def __init__(
+        self, from_date: datetime.date, to_date: datetime.date, window: int, shrink_at: int, *, backward: bool = False
+    ):
+        if from_date > to_date:
+            raise ValueError("from_date must be before to_date")
+        if window < 1:
+            raise ValueError("window must be at least 1 day")
+        self.from_date = from_date
+        self.to_date = to_date
+        self.window = window
+        self.shrink_at = shrink_at
+        self.backward = backward
+        self._cursor: typing.Optional[datetime.date] = to_date if backward else from_date
+
+    def next(self) -> typing.Optional[tuple[datetime.date, datetime.date]]:
+        """
+        Plan next window
+
+        Returns:
+            success (tuple[datetime.date, datetime.date] or None): first and last day of the window
+            or None if the whole range is planned
+        """
+        if self._cursor is None:
+            return None
+        size = datetime.timedelta(days=self.window - 1)
+        if self.backward:
+            end = self._cursor
+            start = max(end - size, self.from_date)
+            self._cursor = None if start <= self.from_date else start - datetime.timedelta(days=1)
+            return start, end
+        start = self._cursor
+        end = min(start + size, self.to_date)
+        self._cursor = None if end >= self.to_date else end + datetime.timedelta(days=1)
+        return start, end
+
+    def observe(self, window: tuple[datetime.date, datetime.date], count: int):
+        """
+        Record the number of transactions returned for a window
+
+        Args:
+            window (tuple[datetime.date, datetime.date]): fetched window
+            count (int): number of transactions in the response
+        """
+        if count >= self.shrink_at:
+            self.window = max(1, min(self.window, (window[1] - window[0]).days + 1) // 2)
+
+    def split(
+        self, window: tuple[datetime.date, datetime.date]
+    ) -> typing.Optional[list[tuple[datetime.date, datetime.date]]]:
+        """
+        Split a window in two halves after it failed, next windows are planned with the smaller size too
+
+        Args:
+            window (tuple[datetime.date, datetime.date]): failed window
+
+        Returns:
+            success (list[tuple[datetime.date, datetime.date]] or None): the two halves in planning order
+            or None if the window is a single day
+        """
+        days = (window[1] - window[0]).days + 1
+        if days < 2:
+            return None
+        self.window = max(1, min(self.window, days // 2))
+        middle = window[0] + datetime.timedelta(days=days // 2 - 1)
+        halves = [(window[0], middle), (middle + datetime.timedelta(days=1), window[1])]
+        return halves[::-1] if self.backward else halves
+
+
+class BackfillProgress(typing.NamedTuple):
+    """
+    Progress of a history backfill reported after each saved window
+
+    Attributes:
+        account_no (str): account number
+        from_date (datetime.date): oldest day to backfill
+        to_date (datetime.date): newest day to backfill
+        done_until (datetime.date or None): every day from it to `to_date` is saved, None if nothing saved yet
+        windows (int): windows saved by this run
+        transactions (int): transactions fetched by this run
+        elapsed (float): seconds since this run started
+    """
+
+    account_no: str
+    from_date: datetime.date
+    to_date: datetime.date
+    done_until: typing.Optional[datetime.date]
+    windows: int
+    transactions: int
+    elapsed: float
+
+    @property
+    def days_total(self) -> int:
+        """Number of days to backfill"""
+        return (self.to_date - self.from_date).days + 1
+
+    @property
+    def days_done(self) -> int:
+        """Number of days already saved, including previous runs"""
+        return 0 if self.done_until is None else (self.to_date - self.done_until).days + 1
+
+    @property
+    def finished(self) -> bool:
+        """True when every day is saved"""
+        return self.done_until is not None and self.done_until <= self.from_date
+
+    @property
+    def transactions_per_second(self) -> float:
+        """Throughput of this run"""
+        return self.transactions / self.elapsed if self.elapsed > 0 else 0.0
+
+
+__all__ = ["BackfillProgress", "HistoryWindows"]
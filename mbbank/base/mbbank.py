@@ -1,8 +1,26 @@
+import asyncio
+import contextlib
 import datetime
+import os
+import threading
+import time
 import typing
 
+import mbbank
+from mbbank.base.bank_directory import BankDirectory
+from mbbank.base.history import BackfillProgress, HistoryWindows
+from mbbank.base.request_id import request_id_generator
+from mbbank.base.watch import BalanceGate, SeenSet
+from mbbank.cache import DiskCache, HistoryRangeCache, ResponseCache
 from mbbank.capcha_ocr import CapchaOCR, CapchaProcessing
 from mbbank.encryption_backend import EncryptionBackend, NativeBackend
+from mbbank.errors import MBBankError
+from mbbank.modals import BalanceResponseModal, BankListResponseModal, Transaction
+from mbbank.session_store import SessionState, SessionStore
+from mbbank.transaction_store import BackfillCheckpoint, TransactionStore, parse_transaction_time
+from mbbank.transport import Transport
+
+_T = typing.TypeVar("_T")
 
 
 class MBBankBase:
@@ -11,16 +29,68 @@ class MBBankBase:
     Attributes:
         deviceIdCommon (str): Device id common
         sessionId (str or None): Current Session id
+        keepalive_error (Exception or None): error that stopped the background keep-alive
 
     Args:
         username (str): MBBank Account Username
         password (str): MBBank Account Password
-        ocr_class (CapchaProcessing, optional): instance of CapchaProcessing class. Defaults to CapchaOCR().
+        ocr_class (CapchaProcessing, optional): instance of CapchaProcessing class. Defaults to CapchaOCR.shared().
         retry_times (int, optional): number of retry times for capcha processing. Defaults to 30 ( worst case ).
+        transport (Transport): http transport used to send every request.
+        session_store (SessionStore, optional): store to save the session after login and restore it before
+        doing a capcha login, a restored session is used until the server reject it with GW200. Defaults to None.
+        prefetch_capcha (bool, optional): keep one capcha already solved in background so a login again costs
+        a single login request. Defaults to False.
+        capcha_max_age (float, optional): seconds a prefetched capcha is considered valid. Defaults to 60.
+        capcha_min_confidence (float, optional): OCR confidence between 0 and 1 under which a new capcha is fetched
+        instead of spending a login request on a likely wrong guess, the last try is always submitted. Defaults to 0.
+        device_id (str, optional): device id common to use, when not set a new one is generated
+        or the one saved in `session_store` for this account is reused. Defaults to None.
+        cache_ttl (dict[str, float], optional): seconds the response of each read method is cached by method name,
+        merged over `CACHE_TTL`, 0 to not cache a method. Defaults to `CACHE_TTL`.
+        cache_stale_ttl (float, optional): extra seconds an expired response is still returned while it's refreshed
+        in background ( stale-while-revalidate ). Defaults to 60.
+        cache_size (int, optional): maximum number of cached responses. Defaults to 256.
+        cache_dir (str or os.PathLike, optional): directory to persist reference data listed in `disk_cache_ttl`
+        ( e.g. bank list ) so a new process serve them without a request, can be shared by accounts. Defaults to None.
+        disk_cache_ttl (dict[str, float], optional): seconds the response of each method is kept in `cache_dir`
+        by method name. Defaults to `DISK_CACHE_TTL`.
+        prewarm_ocr (bool, optional): load the OCR model and initialize it in a background thread right away
+        so the first login doesn't wait for it. Defaults to False.
+        history_cache (bool, optional): remember the days of account history already fetched so
+        `getTransactionAccountHistory` only fetch the days missing from overlapping ranges,
+        past days are kept `HISTORY_CACHE_TTL` and today `HISTORY_CACHE_TODAY_TTL` seconds. Defaults to False.
     """
 
     FPR: typing.ClassVar[str] = "c7a1beebb9400375bb187daa33de9659"
 
+    # cheap authenticated call used by background keep-alive
+    KEEPALIVE_PATH: typing.ClassVar[str] = "/api/retail-accountms/accountms/getBalance"
+    # longest wait between keep-alive retries after failures, in seconds
+    KEEPALIVE_MAX_BACKOFF: typing.ClassVar[float] = 3600
+
+    # responses that rarely change, in seconds
+    CACHE_TTL: typing.ClassVar[dict[str, float]] = {
+        "getBankList": 24 * 60 * 60,
+        "getInterestRate": 60 * 60,
+        "getCardList": 5 * 60,
+    }
+
+    # reference data that is the same for every account, in seconds
+    DISK_CACHE_TTL: typing.ClassVar[dict[str, float]] = {
+        "getBankList": 24 * 60 * 60,
+        "getInterestRate": 60 * 60,
+    }
+
+    # longest date range accepted by transaction history endpoints, in days
+    MAX_HISTORY_WINDOW: typing.ClassVar[int] = 90
+    # transactions in one history response that make next windows of iterTransactionHistory smaller
+    HISTORY_SHRINK_AT: typing.ClassVar[int] = 500
+
+    # seconds account history of a past day and of today is kept by history_cache
+    HISTORY_CACHE_TTL: typing.ClassVar[float] = 60 * 60
+    HISTORY_CACHE_TODAY_TTL: typing.ClassVar[float] = 60
+
     HEADERS_DEFAULT: typing.ClassVar[dict] = {
         "Cache-Control": "max-age=0",
         "Accept": "application/json, text/plain, */*",
@@ -45,26 +115,339 @@ class MBBankBase:
         ocr_class: typing.Optional[CapchaProcessing] = None,
         encryption_backend: typing.Optional[EncryptionBackend] = None,
         retry_times: int = 30,
+        transport: Transport,
+        session_store: typing.Optional[SessionStore] = None,
+        prefetch_capcha: bool = False,
+        capcha_max_age: float = 60,
+        capcha_min_confidence: float = 0,
+        device_id: typing.Optional[str] = None,
+        cache_ttl: typing.Optional[dict[str, float]] = None,
+        cache_stale_ttl: float = 60,
+        cache_size: int = 256,
+        cache_dir: str | os.PathLike | None = None,
+        disk_cache_ttl: typing.Optional[dict[str, float]] = None,
+        history_cache: bool = False,
+        prewarm_ocr: bool = False,
     ):
         self._userid = username
         self._password = password
-        self.ocr_class: CapchaProcessing = CapchaOCR()
+        # default OCR is shared by every client of the process and loads its model on the first capcha
+        self.ocr_class: CapchaProcessing = CapchaOCR.shared()
         if ocr_class is not None:
             if not isinstance(ocr_class, CapchaProcessing):
                 raise ValueError("ocr_class must be instance of CapchaProcessing")
             self.ocr_class = ocr_class
+        if prewarm_ocr:
+            # a login meanwhile waits on the model lock instead of loading it again
+            threading.Thread(target=self._prewarm_ocr, name="mbbank-ocr-prewarm", daemon=True).start()
         self.encryption_backend = NativeBackend()
         if encryption_backend is not None:
             if not isinstance(encryption_backend, EncryptionBackend):
                 raise ValueError("encryption_backend must be instance of EncryptionBackend")
             self.encryption_backend = encryption_backend
+        if not isinstance(transport, Transport):
+            raise ValueError("transport must be instance of Transport")
+        self.transport = transport
+        if session_store is not None and not isinstance(session_store, SessionStore):
+            raise ValueError("session_store must be instance of SessionStore")
+        self.session_store = session_store
         self.sessionId: typing.Optional[str] = None
         self._userinfo: typing.Optional[dict] = None
-        self._temp: dict = {}
-        self.deviceIdCommon = f"abi2jojr-mbib-0000-0000-{self._get_now_time()}"
+        # an explicit device id is kept even if the session store saved another one
+        self._device_id_pinned = device_id is not None
+        self.deviceIdCommon = device_id or f"abi2jojr-mbib-0000-0000-{self._get_now_time()}"
         self.retry_times = retry_times
+        # single-flight guard so concurrent callers wait for one login instead of each running their own
+        self._auth_lock = threading.RLock()
+        self._auth_owner: typing.Optional[int] = None
+        self._async_auth_lock: typing.Optional[asyncio.Lock] = None
+        self._async_auth_loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._async_auth_owner: typing.Optional[asyncio.Task] = None
+        # session age and idle time tracking for background keep-alive (unix time)
+        self._session_created_at: typing.Optional[float] = None
+        self._last_request_at: float = 0
+        self.keepalive_error: typing.Optional[Exception] = None
+        self.prefetch_capcha = prefetch_capcha
+        self.capcha_max_age = capcha_max_age
+        if not 0 <= capcha_min_confidence <= 1:
+            raise ValueError("capcha_min_confidence must be between 0 and 1")
+        self.capcha_min_confidence = capcha_min_confidence
+        # prefetched (capcha text, monotonic time fetched)
+        self._capcha_buffer: typing.Optional[tuple[str, float]] = None
+        # defaults are kept for methods not listed, e.g. the bank list used by every transfer
+        self.cache_ttl: dict[str, float] = {**self.CACHE_TTL, **(cache_ttl or {})}
+        self.cache_stale_ttl = cache_stale_ttl
+        self._cache = ResponseCache(cache_size)
+        self.disk_cache_ttl: dict[str, float] = dict(self.DISK_CACHE_TTL if disk_cache_ttl is None else disk_cache_ttl)
+        # entries saved by another library version may not match the response models anymore
+        self._disk_cache = None if cache_dir is None else DiskCache(cache_dir, version=mbbank.__version__)
+        self._history_cache = (
+            HistoryRangeCache(self.HISTORY_CACHE_TTL, self.HISTORY_CACHE_TODAY_TTL) if history_cache else None
+        )
+        self._bank_list: typing.Optional[BankListResponseModal] = None
+        self._bank_directory: typing.Optional[BankDirectory] = None
+
+    def _prewarm_ocr(self):
+        # errors are raised again by the first capcha that needs the model
+        with contextlib.suppress(Exception):
+            self.ocr_class.prewarm()
+
+    def invalidate_cache(self, endpoint: typing.Optional[str] = None):
+        """
+        Remove cached responses in memory and in `cache_dir` so the next call fetch them from the server
+
+        Args:
+            endpoint (str, optional): only remove responses of this method, e.g. "getCardList",
+            remove everything when not set. Defaults to None.
+        """
+        self._cache.invalidate(endpoint)
+        if self._disk_cache is not None:
+            self._disk_cache.invalidate(endpoint)
+        if self._history_cache is not None and endpoint in (None, "getTransactionAccountHistory"):
+            self._history_cache.invalidate()
+        if endpoint in (None, "getBankList"):
+            self._bank_list = None
+            self._bank_directory = None
+
+    def _cache_key(self, endpoint: str, args: tuple, kwargs: dict) -> typing.Optional[tuple]:
+        # None when the endpoint is not cached or the arguments can't be used as a key
+        if not self.cache_ttl.get(endpoint):
+            return None
+        key = (endpoint, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _get_bank_directory(self, bank_list: BankListResponseModal) -> BankDirectory:
+        # rebuild the indexes only when the banks changed, not for every response fetched again with the same banks
+        if self._bank_directory is None or self._bank_list is None or self._bank_list.listBank != bank_list.listBank:
+            self._bank_directory = BankDirectory(bank_list)
+        self._bank_list = bank_list
+        return self._bank_directory
+
+    def _update_bank_directory(self, bank_list: BankListResponseModal):
+        # called with each bank list fetched, the directory is only built on first use
+        if self._bank_directory is not None:
+            self._get_bank_directory(bank_list)
+
+    def _history_windows(
+        self, from_date: datetime.datetime, to_date: datetime.datetime, window: int, *, backward: bool = False
+    ) -> HistoryWindows:
+        if not 1 <= window <= self.MAX_HISTORY_WINDOW:
+            raise ValueError(f"window must be between 1 and {self.MAX_HISTORY_WINDOW} days")
+        return HistoryWindows(from_date.date(), to_date.date(), window, self.HISTORY_SHRINK_AT, backward=backward)
+
+    def _transaction_sync_range(
+        self,
+        store: TransactionStore,
+        watermark: typing.Optional[datetime.date],
+        from_date: typing.Optional[datetime.datetime],
+        overlap: datetime.timedelta,
+    ) -> tuple[datetime.datetime, datetime.datetime]:
+        # refetch a bit before the watermark for transactions posted late
+        if not isinstance(store, TransactionStore):
+            raise ValueError("store must be instance of TransactionStore")
+        to_date = datetime.datetime.now()
+        if watermark is not None:
+            from_date = datetime.datetime.combine(watermark, datetime.time()) - overlap
+        elif from_date is None:
+            from_date = to_date - datetime.timedelta(days=self.MAX_HISTORY_WINDOW)
+        return min(from_date, to_date), to_date
+
+    def _backfill_start(
+        self,
+        store: TransactionStore,
+        checkpoint: typing.Optional[BackfillCheckpoint],
+        account_no: str,
+        from_date: datetime.datetime,
+        to_date: typing.Optional[datetime.datetime],
+        window: int,
+    ) -> tuple[BackfillCheckpoint, typing.Optional[HistoryWindows]]:
+        # resume below the oldest saved day, None windows when there is nothing left to fetch
+        if not isinstance(store, TransactionStore):
+            raise ValueError("store must be instance of TransactionStore")
+        if checkpoint is None:
+            newest = datetime.datetime.now() if to_date is None else to_date
+            checkpoint = BackfillCheckpoint(account_no=account_no, from_date=from_date.date(), to_date=newest.date())
+        elif from_date.date() < checkpoint.from_date:
+            checkpoint = checkpoint.model_copy(update={"from_date": from_date.date()})
+        end = checkpoint.to_date
+        if checkpoint.done_until is not None:
+            end = checkpoint.done_until - datetime.timedelta(days=1)
+        if end < checkpoint.from_date:
+            return checkpoint, None
+        start, end = (datetime.datetime.combine(day, datetime.time()) for day in (checkpoint.from_date, end))
+        return checkpoint, self._history_windows(start, end, window, backward=True)
+
+    @staticmethod
+    def _backfill_progress(
+        checkpoint: BackfillCheckpoint, windows: int, transactions: int, started: float
+    ) -> BackfillProgress:
+        return BackfillProgress(
+            account_no=checkpoint.account_no,
+            from_date=checkpoint.from_date,
+            to_date=checkpoint.to_date,
+            done_until=checkpoint.done_until,
+            windows=windows,
+            transactions=transactions,
+            elapsed=time.monotonic() - started,
+        )
+
+    @staticmethod
+    def _watch_window(last_day: typing.Optional[datetime.date]) -> tuple[datetime.datetime, datetime.datetime]:
+        # today only, plus the previous polled day after midnight so late transactions of that day are not missed
+        to_date = datetime.datetime.now()
+        first_day = to_date.date() if last_day is None else min(last_day, to_date.date())
+        return datetime.datetime.combine(first_day, datetime.time()), to_date
+
+    def _watch_accounts(self, accountNo: str | list[str] | None) -> list[str]:
+        if accountNo is None:
+            return [self._userid]
+        return [accountNo] if isinstance(accountNo, str) else list(accountNo)
+
+    def _watch_default_account(self, balance: BalanceResponseModal) -> str:
+        # the history default is the username, only an account number for accounts named after it,
+        # otherwise watch an account listed by getBalance so balance_gated can gate it
+        listed = [account.acctNo for account in balance.acct_list]
+        if not listed or self._userid in listed:
+            return self._userid
+        default_account = ((self._userinfo or {}).get("cust") or {}).get("defaultAccount") or {}
+        return default_account["acctNo"] if default_account.get("acctNo") in listed else listed[0]
+
+    @staticmethod
+    def _watch_collect(
+        histories: list[tuple[str, datetime.datetime, list[Transaction]]],
+        seen: SeenSet,
+        last_days: dict[str, datetime.date],
+        skip_existing: bool,
+        gate: typing.Optional[BalanceGate],
+    ) -> list[Transaction]:
+        # only called once every history of the tick is fetched, so a failed tick doesn't mark anything as seen
+        new: list[Transaction] = []
+        for account, to_date, transactions in histories:
+            found = [transaction for transaction in transactions if seen.add(transaction.refNo)]
+            if account not in last_days and skip_existing:
+                found = []
+            last_days[account] = to_date.date()
+            if gate is not None:
+                gate.fetched(account, len(found))
+            new.extend(found)
+        # oldest first so callers confirm payments in the order they happened
+        return sorted(new, key=lambda t: parse_transaction_time(t.transactionDate) or datetime.datetime.min)
+
+    @staticmethod
+    def _dedupe_transactions(transactions: typing.Iterable[_T], seen: set[str]) -> typing.Iterator[_T]:
+        # windows don't overlap by date but posting and transaction date can differ, so skip refNo seen already
+        for transaction in transactions:
+            ref_no = getattr(transaction, "refNo", None)
+            if ref_no is not None:
+                if ref_no in seen:
+                    continue
+                seen.add(ref_no)
+            yield transaction
+
+    def _get_async_auth_lock(self) -> asyncio.Lock:
+        # an asyncio lock is bound to its event loop, make a new one when the client is used by another loop
+        loop = asyncio.get_running_loop()
+        if self._async_auth_lock is None or self._async_auth_loop is not loop:
+            self._async_auth_lock = asyncio.Lock()
+            self._async_auth_loop = loop
+            self._async_auth_owner = None
+        return self._async_auth_lock
+
+    def _need_authenticate(self, stale_session_id: typing.Optional[str]) -> bool:
+        # a session other than the stale one means another caller already logged in while we were waiting
+        return self.sessionId is None or self._userinfo is None or self.sessionId == stale_session_id
+
+    def export_session(self) -> SessionState:
+        """
+        Export current logged in session state, can be restored later with `import_session`
+
+        Returns:
+            success (SessionState): current session state
+
+        Raises:
+            MBBankError: if not logged in yet
+        """
+        if self.sessionId is None or self._userinfo is None:
+            raise MBBankError("Not logged in, there is no session to export")
+        return SessionState(
+            username=self._userid,
+            sessionId=self.sessionId,
+            deviceIdCommon=self.deviceIdCommon,
+            userinfo=self._userinfo,
+            timestamp=self._session_created_at if self._session_created_at is not None else time.time(),
+        )
+
+    def import_session(self, state: SessionState):
+        """
+        Restore session state exported by `export_session`, the client fall back to capcha login
+        when the server reject the session with GW200.
+
+        Args:
+            state (SessionState): session state to restore
+
+        Raises:
+            MBBankError: if session state belongs to another account
+        """
+        if state.username != self._userid:
+            raise MBBankError("Session state belongs to another account")
+        self.deviceIdCommon = state.deviceIdCommon
+        self._userinfo = state.userinfo
+        self.sessionId = state.sessionId
+        self._session_created_at = state.timestamp
+        self._last_request_at = time.time()
+
+    def _next_keepalive_action(
+        self, interval: float, max_age: typing.Optional[float]
+    ) -> tuple[float, typing.Optional[typing.Literal["refresh", "ping"]]]:
+        # return seconds to wait before the next check and the action due now if any
+        if self.sessionId is None or self._session_created_at is None:
+            return interval, None  # nothing to keep alive until the first login
+        now = time.time()
+        wait = self._last_request_at + interval - now
+        if max_age is not None:
+            refresh_in = self._session_created_at + max_age - now
+            if refresh_in <= 0:
+                return 0, "refresh"
+            wait = min(wait, refresh_in)
+        if wait <= 0:
+            return 0, "ping"
+        return wait, None
+
+    def _keepalive_retry_delay(self, interval: float, failures: int) -> float:
+        # exponential backoff so a login that keeps failing ( e.g. changed password ) isn't retried every second
+        return min(interval * 2 ** (failures - 1), self.KEEPALIVE_MAX_BACKOFF)
+
+    def _take_prefetched_capcha(self) -> typing.Optional[str]:
+        # a capcha can only be used once, so taking it empties the buffer
+        buffer, self._capcha_buffer = self._capcha_buffer, None
+        if buffer is None or time.monotonic() - buffer[1] > self.capcha_max_age:
+            return None
+        return buffer[0]
+
+    def _capcha_refill_delay(self) -> float:
+        # seconds until the prefetched capcha should be replaced, refreshed a bit before it expires
+        if self._capcha_buffer is None:
+            return 0
+        return max(0.0, self._capcha_buffer[1] + self.capcha_max_age * 0.8 - time.monotonic())
+
+    def _restore_session(self, state: typing.Optional[SessionState], stale_session_id: typing.Optional[str]) -> bool:
+        # a saved session is only worth trying when it's not the one the server just rejected
+        if state is None or state.sessionId == stale_session_id:
+            return False
+        self.import_session(state)
+        return True
+
+    def _adopt_device_id(self, saved_device_id: typing.Optional[str]) -> bool:
+        # use the device id saved for this account, return True when ours should be saved instead
+        if saved_device_id is None or self._device_id_pinned:
+            return saved_device_id != self.deviceIdCommon
+        self.deviceIdCommon = saved_device_id
+        return False
 
     def _get_now_time(self) -> str:
-        now = datetime.datetime.now()
-        microsecond = int(now.strftime("%f")[:2])
-        return now.strftime(f"%Y%m%d%H%M{microsecond}")
+        # unique per process, used for refNo, request id and device id
+        return request_id_generator.next_id()
@@ -0,0 +1,41 @@
+import datetime
+import threading
+import time
+
+
+class RequestIdGenerator:
+    """
+    Thread-safe generator of numeric ids used for refNo, request id and device id.
+
+    Ids keep the format the server accepts, `YYYYMMDDHHMM` followed by a number from 0 to 99 without padding
+    ( 13 or 14 digits ), the number follows the position in the minute and is increased when needed
+    so ids are strictly increasing inside a process. More than 100 ids in a minute or a system clock going backward
+    make ids run ahead of the clock until it catches up.
+    """
+
+    # ids available per minute, the number after the minute is 0-99
+    SLOTS_PER_MINUTE = 100
+
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        """
+        Generate next id
+
+        Returns:
+            success (str): numeric id, unique in this process
+        """
+        minute, offset = divmod(time.time(), 60)
+        with self._lock:
+            tick = max(self._last + 1, int(minute) * self.SLOTS_PER_MINUTE + int(offset * self.SLOTS_PER_MINUTE / 60))
+            self._last = tick
+        minute, slot = divmod(tick, self.SLOTS_PER_MINUTE)
+        return f"{datetime.datetime.fromtimestamp(minute * 60):%Y%m%d%H%M}{slot}"
+
+
+# shared by every client so ids don't collide between clients of the same process
+request_id_generator = RequestIdGenerator()
+
+__all__ = ["RequestIdGenerator", "request_id_generator"]
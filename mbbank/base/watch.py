@@ -0,0 +1,150 @@
+import collections
+import typing
+
+
+class SeenSet:
+    """
+    Set of the most recently added keys, the oldest keys are forgotten once `maxsize` is reached
+
+    Args:
+        maxsize (int): maximum number of keys remembered
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._keys: collections.OrderedDict[typing.Hashable, None] = collections.OrderedDict()
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: typing.Hashable) -> bool:
+        """
+        Remember a key
+
+        Args:
+            key (Hashable): key to remember
+
+        Returns:
+            success (bool): True if the key was not seen before
+        """
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+        return True
+
+
+class AdaptivePollInterval:
+    """
+    Poll interval that goes back to `min_interval` when something new is found,
+    slowly grows toward `max_interval` while idle and backs off faster on errors.
+
+    Args:
+        min_interval (float): shortest seconds between polls
+        max_interval (float): longest seconds between polls
+        idle_factor (float, optional): growth of the interval after a poll found nothing new. Defaults to 1.5.
+        error_factor (float, optional): growth of the interval after a poll failed. Defaults to 2.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, idle_factor: float = 1.5, error_factor: float = 2):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("min_interval must be positive and not greater than max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_factor = idle_factor
+        self.error_factor = error_factor
+        self.interval = min_interval
+        self.errors = 0
+
+    def on_result(self, new_items: int) -> float:
+        """
+        Record a successful poll
+
+        Args:
+            new_items (int): number of new items found
+
+        Returns:
+            success (float): seconds to wait before next poll
+        """
+        self.errors = 0
+        if new_items:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.idle_factor)
+        return self.interval
+
+    def on_error(self) -> float:
+        """
+        Record a failed poll
+
+        Returns:
+            success (float): seconds to wait before next poll
+        """
+        self.errors += 1
+        self.interval = min(self.max_interval, self.interval * self.error_factor)
+        return self.interval
+
+
+class BalanceGate:
+    """
+    Pick the accounts whose transaction history is worth fetching from their balances,
+    an account is fetched when its balance changed ( or is unknown ) and keeps being fetched for a few ticks
+    until a new transaction shows up, as the history can be updated a bit later than the balance.
+
+    Args:
+        hot_ticks (int, optional): ticks an account is fetched after its balance changed. Defaults to 3.
+    """
+
+    def __init__(self, hot_ticks: int = 3):
+        self.hot_ticks = hot_ticks
+        self._balances: dict[str, typing.Optional[str]] = {}
+        self._hot: dict[str, int] = {}
+
+    def due(self, accounts: list[str], balances: dict[str, typing.Optional[str]]) -> list[str]:
+        """
+        Get accounts to fetch this tick
+
+        Args:
+            accounts (list[str]): watched account numbers
+            balances (dict[str, str or None]): current balance by account number
+
+        Returns:
+            success (list[str]): accounts to fetch, accounts without balance are always fetched
+        """
+        due = []
+        for account in accounts:
+            if account not in balances:
+                due.append(account)
+                continue
+            if account not in self._balances:
+                self._hot[account] = 1  # first tick only needs one fetch to know the existing transactions
+            elif self._balances[account] != balances[account]:
+                self._hot[account] = self.hot_ticks
+            self._balances[account] = balances[account]
+            if self._hot.get(account, 0) > 0:
+                due.append(account)
+        return due
+
+    def fetched(self, account: str, new_items: int):
+        """
+        Record the history fetch of an account
+
+        Args:
+            account (str): account number
+            new_items (int): number of new transactions found
+        """
+        hot = self._hot.get(account, 0) - 1
+        if new_items or hot <= 0:
+            self._hot.pop(account, None)
+        else:
+            self._hot[account] = hot
+
+
+__all__ = ["AdaptivePollInterval", "BalanceGate", "SeenSet"]
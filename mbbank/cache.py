@@ -0,0 +1,352 @@
+import collections
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import typing
+
+from mbbank.modals import Transaction, TransactionHistoryResponseModal
+from mbbank.transaction_store.base import parse_transaction_time
+
+
+class CacheEntry(typing.NamedTuple):
+    """
+    Cached value with its freshness deadlines
+
+    Attributes:
+        value (Any): cached value
+        fresh_until (float): monotonic time the value stops being fresh
+        stale_until (float): monotonic time the value can't be served anymore even while revalidating
+    """
+
+    value: typing.Any
+    fresh_until: float
+    stale_until: float
+
+
+class ResponseCache:
+    """
+    Thread-safe in-memory LRU cache with per entry TTL and stale-while-revalidate window
+
+    Keys are tuples starting with the endpoint name so all entries of an endpoint can be invalidated at once.
+
+    Args:
+        maxsize (int, optional): maximum number of entries, least recently used entries are evicted first. Defaults to 256.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries: collections.OrderedDict[tuple, CacheEntry] = collections.OrderedDict()
+        self._refreshing: set[tuple] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> typing.Optional[CacheEntry]:
+        """
+        Get entry still allowed to be served ( fresh or stale )
+
+        Args:
+            key (tuple): cache key
+
+        Returns:
+            success (CacheEntry or None): cached entry or None if missing or expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: tuple, value: typing.Any, ttl: float, stale_ttl: float = 0):
+        """
+        Save value in cache
+
+        Args:
+            key (tuple): cache key
+            value (Any): value to cache
+            ttl (float): seconds the value is fresh
+            stale_ttl (float, optional): extra seconds the value is served while being refreshed in background. Defaults to 0.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = CacheEntry(value, now + ttl, now + ttl + stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def begin_refresh(self, key: tuple) -> bool:
+        """
+        Mark a stale key as being refreshed so only one background refresh run per key
+
+        Args:
+            key (tuple): cache key
+
+        Returns:
+            success (bool): True if the caller should refresh the key
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: tuple):
+        """
+        Unmark a key marked by `begin_refresh`
+
+        Args:
+            key (tuple): cache key
+        """
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def invalidate(self, endpoint: typing.Optional[str] = None):
+        """
+        Remove cached entries
+
+        Args:
+            endpoint (str, optional): only remove entries of this endpoint ( method name, e.g. "getCardList" ),
+            remove everything when not set. Defaults to None.
+        """
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == endpoint]:
+                del self._entries[key]
+
+
+class DiskCache:
+    """
+    Persistent cache of raw json responses, one json file per entry in a directory,
+    used for reference data shared by every account ( e.g. bank list ) so a new process can skip fetching them.
+
+    Entries saved by another cache version or already expired are ignored, writes are atomic
+    and errors are ignored as the cache is only an optimization.
+
+    Args:
+        directory (str or os.PathLike): directory to save cache files, created if not exists
+        version (str, optional): cache version, change it to ignore every entry saved before. Defaults to "".
+    """
+
+    FORMAT_VERSION: typing.ClassVar[int] = 1
+
+    def __init__(self, directory: str | os.PathLike, *, version: str = ""):
+        self.directory = os.fspath(directory)
+        self.version = f"{self.FORMAT_VERSION}:{version}"
+
+    def _path(self, endpoint: str, params: typing.Any) -> str:
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{endpoint}-{digest}.json")
+
+    def load(self, endpoint: str, params: typing.Any = None) -> typing.Optional[typing.Any]:
+        """
+        Load cached data
+
+        Args:
+            endpoint (str): endpoint name, e.g. "getBankList"
+            params (Any, optional): json serializable request parameters. Defaults to None.
+
+        Returns:
+            success (Any or None): cached data or None if missing, expired or saved by another version
+        """
+        try:
+            with open(self._path(endpoint, params), encoding="utf-8") as f:
+                entry = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != self.version:
+            return None
+        if not isinstance(entry.get("expires"), (int, float)) or entry["expires"] <= time.time():
+            return None
+        return entry.get("data")
+
+    def save(self, endpoint: str, params: typing.Any, data: typing.Any, ttl: float):
+        """
+        Save data in cache
+
+        Args:
+            endpoint (str): endpoint name, e.g. "getBankList"
+            params (Any): json serializable request parameters
+            data (Any): json serializable data to cache
+            ttl (float): seconds the data is valid
+        """
+        path = self._path(endpoint, params)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        payload = json.dumps({"version": self.version, "expires": time.time() + ttl, "data": data})
+        with contextlib.suppress(OSError):
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            # atomic replace so readers never see a half written file
+            os.replace(tmp_path, path)
+
+    def invalidate(self, endpoint: typing.Optional[str] = None):
+        """
+        Remove cached entries
+
+        Args:
+            endpoint (str, optional): only remove entries of this endpoint, remove everything when not set. Defaults to None.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        prefix = "" if endpoint is None else f"{endpoint}-"
+        for name in names:
+            if name.endswith(".json") and name.startswith(prefix):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self.directory, name))
+
+
+class HistoryRangeCache:
+    """
+    Thread-safe cache of account transaction history by day, remembering which days were already fetched
+    so overlapping ranges only fetch the days still missing.
+
+    Transactions are filed under the day of their transaction date ( clamped to the fetched range ),
+    today is kept for a short time as new transactions keep arriving.
+
+    Args:
+        ttl (float): seconds a past day is kept
+        today_ttl (float): seconds today is kept
+    """
+
+    def __init__(self, ttl: float, today_ttl: float):
+        self.ttl = ttl
+        self.today_ttl = today_ttl
+        # account -> day -> (monotonic time fetched, transactions)
+        self._days: dict[str, dict[datetime.date, tuple[float, list[Transaction]]]] = {}
+        self._templates: dict[str, TransactionHistoryResponseModal] = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, day: datetime.date, fetched_at: float, now: float) -> bool:
+        ttl = self.today_ttl if day >= datetime.date.today() else self.ttl
+        return now - fetched_at < ttl
+
+    def missing(
+        self, account_no: str, from_date: datetime.date, to_date: datetime.date
+    ) -> list[tuple[datetime.date, datetime.date]]:
+        """
+        Get ranges of days not cached or expired
+
+        Args:
+            account_no (str): account number
+            from_date (datetime.date): first day
+            to_date (datetime.date): last day
+
+        Returns:
+            success (list[tuple[datetime.date, datetime.date]]): consecutive missing days as ( first, last ) in order
+        """
+        now = time.monotonic()
+        ranges: list[tuple[datetime.date, datetime.date]] = []
+        with self._lock:
+            days = self._days.get(account_no, {})
+            day = from_date
+            while day <= to_date:
+                entry = days.get(day)
+                if entry is None or not self._is_fresh(day, entry[0], now):
+                    if ranges and ranges[-1][1] == day - datetime.timedelta(days=1):
+                        ranges[-1] = (ranges[-1][0], day)
+                    else:
+                        ranges.append((day, day))
+                day += datetime.timedelta(days=1)
+        return ranges
+
+    def put(
+        self,
+        account_no: str,
+        from_date: datetime.date,
+        to_date: datetime.date,
+        response: TransactionHistoryResponseModal,
+    ):
+        """
+        Save the history fetched for a range of days, replacing what was cached for these days
+
+        Args:
+            account_no (str): account number
+            from_date (datetime.date): first day fetched
+            to_date (datetime.date): last day fetched
+            response (TransactionHistoryResponseModal): history response of the range
+        """
+        now = time.monotonic()
+        buckets: dict[datetime.date, list[Transaction]] = {}
+        day = from_date
+        while day <= to_date:
+            buckets[day] = []
+            day += datetime.timedelta(days=1)
+        for transaction in response.transactionHistoryList:
+            transaction_time = parse_transaction_time(transaction.transactionDate)
+            day = from_date if transaction_time is None else transaction_time.date()
+            buckets[min(max(day, from_date), to_date)].append(transaction)
+        with self._lock:
+            days = self._days.setdefault(account_no, {})
+            for day, transactions in buckets.items():
+                days[day] = (now, transactions)
+            self._templates[account_no] = response
+
+    def get(
+        self, account_no: str, from_date: datetime.date, to_date: datetime.date
+    ) -> typing.Optional[TransactionHistoryResponseModal]:
+        """
+        Build history response of a range from cached days
+
+        Args:
+            account_no (str): account number
+            from_date (datetime.date): first day
+            to_date (datetime.date): last day
+
+        Returns:
+            success (TransactionHistoryResponseModal or None): history response with transactions ordered by day
+            and without repeated refNo, or None if nothing was fetched yet
+        """
+        with self._lock:
+            template = self._templates.get(account_no)
+            if template is None:
+                return None
+            days = self._days.get(account_no, {})
+            transactions = [
+                transaction
+                for day in sorted(day for day in days if from_date <= day <= to_date)
+                for transaction in days[day][1]
+            ]
+        # days refetched separately can both hold a transaction posted on another day than its transaction date
+        seen: set[str] = set()
+        unique = []
+        for transaction in transactions:
+            if transaction.refNo:
+                if transaction.refNo in seen:
+                    continue
+                seen.add(transaction.refNo)
+            unique.append(transaction)
+        return template.model_copy(update={"transactionHistoryList": unique})
+
+    def invalidate(self, account_no: typing.Optional[str] = None):
+        """
+        Remove cached history
+
+        Args:
+            account_no (str, optional): only remove history of this account, remove everything when not set. Defaults to None.
+        """
+        with self._lock:
+            if account_no is None:
+                self._days.clear()
+                self._templates.clear()
+            else:
+                self._days.pop(account_no, None)
+                self._templates.pop(account_no, None)
+
+
+__all__ = ["CacheEntry", "DiskCache", "HistoryRangeCache", "ResponseCache"]
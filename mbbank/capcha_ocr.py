@@ -1,10 +1,23 @@
 import asyncio
+import concurrent.futures
 import io
-from typing import Optional
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable
+from typing import Any, ClassVar, Optional
 
+import mb_capcha_ocr
+import numpy as np
+import onnxruntime
 from mb_capcha_ocr import OcrModel
 from PIL import Image
 
+# model shipped with mb-capcha-ocr
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(mb_capcha_ocr.__file__), "model.onnx")
+# input size of the model ( width, height )
+MODEL_INPUT_SIZE = (160, 50)
+
 
 class CapchaProcessing:
     """
@@ -44,20 +57,306 @@ class CapchaProcessing:
         """
         raise NotImplementedError("process_image_async is not implemented")
 
+    def process_image_with_confidence(self, img: bytes) -> tuple[str, float]:
+        """
+        Process image and return text with how likely it is right,
+        implementations without a score return a confidence of 1
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (tuple[str, float]): text from image and confidence between 0 and 1
+        """
+        return self.process_image(img), 1.0
+
+    async def process_image_with_confidence_async(self, img: bytes) -> tuple[str, float]:
+        """
+        Async process image and return text with how likely it is right,
+        implementations without a score return a confidence of 1
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (tuple[str, float]): text from image and confidence between 0 and 1
+        """
+        return await self.process_image_async(img), 1.0
+
+    def process_batch(self, images: list[bytes]) -> list[str]:
+        """
+        Process several images and return their text, one by one unless the implementation batches them
+
+        Args:
+            images (list[bytes]): images input as bytes
+
+        Returns:
+            success (list[str]): text from each image in the same order
+        """
+        return [self.process_image(img) for img in images]
+
+    async def process_batch_async(self, images: list[bytes]) -> list[str]:
+        """
+        Async process several images and return their text, concurrently unless the implementation batches them
+
+        Args:
+            images (list[bytes]): images input as bytes
+
+        Returns:
+            success (list[str]): text from each image in the same order
+        """
+        return list(await asyncio.gather(*(self.process_image_async(img) for img in images)))
+
+    def prewarm(self):
+        """
+        Load everything needed to process a capcha ahead of the first one, called in a background thread
+        when a client is created with `prewarm_ocr=True`, does nothing by default
+        """
+
+
+class _MicroBatcher:
+    """
+    Collect items submitted by concurrent callers for a short window and process them in one batch
+    on a background thread, an item failing makes the batch run again one item at a time
+
+    Args:
+        run (Callable[[list], list]): process a batch, returns one result per item
+        window (float): seconds to wait for more items after the first one
+        max_batch (int): batch size processed without waiting for the window to end
+    """
+
+    def __init__(self, run: Callable[[list], list], window: float, max_batch: int):
+        self.run = run
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[tuple[Any, concurrent.futures.Future]] = []
+        self._full = threading.Event()
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            self._pending.append((item, future))
+            if len(self._pending) == 1:
+                threading.Thread(target=self._flush, name="mbbank-ocr-batch", daemon=True).start()
+            if len(self._pending) >= self.max_batch:
+                self._full.set()
+        return future
+
+    def _flush(self):
+        self._full.wait(self.window)
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._full.clear()
+        # claim the futures so they can't be cancelled anymore, callers cancelled meanwhile are dropped
+        batch = [(item, future) for item, future in pending if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.run([item for item, _ in batch])
+        except Exception:
+            # don't fail every caller because of one bad image
+            for item, future in batch:
+                try:
+                    future.set_result(self.run([item])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results, strict=True):
+            future.set_result(result)
+
+
+class _OnnxOcrModel(OcrModel):
+    # OcrModel doesn't accept session options, build the session ourselves
+    def __init__(self, model_path: Optional[str], sess_options: onnxruntime.SessionOptions):
+        self.chars = sorted(OcrModel.chars)
+        self.session = onnxruntime.InferenceSession(model_path or DEFAULT_MODEL_PATH, sess_options=sess_options)
+
 
 class CapchaOCR(CapchaProcessing):
     """
     Onnx based OCR for capcha processing
     https://pypi.org/project/mb-capcha-ocr/
 
+    The model is loaded on the first capcha and is safe to use from multiple threads,
+    clients without `ocr_class` share the instance returned by `CapchaOCR.shared()`.
+
     Args:
-        model_path (str, optional): path to a model file
+        model_path (str, optional): path to a model file, e.g. an int8 model saved by `CapchaOCR.quantize_model`
+        intra_op_threads (int, optional): threads used to run one operator, onnxruntime picks one per core when not set
+        inter_op_threads (int, optional): threads used to run independent operators, onnxruntime default when not set
+        graph_optimization_level (onnxruntime.GraphOptimizationLevel, optional): graph optimizations applied
+        when the model is loaded. Defaults to onnxruntime default ( all optimizations ).
+        batch_window (float, optional): seconds `process_image_async` waits to gather concurrent capchas
+        in one batch, 0 to disable. Only useful with a model accepting a batch dimension, the model
+        of mb-capcha-ocr has a fixed batch size of 1 so batching only adds the window latency
+        and runs every inference on one thread. Defaults to 0.
+        max_batch (int, optional): batch size processed without waiting for `batch_window` to end. Defaults to 32.
     """
 
-    def __init__(self, model_path: Optional[str] = None):
+    _shared: ClassVar[Optional["CapchaOCR"]] = None
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        batch_window: float = 0,
+        max_batch: int = 32,
+        *,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        graph_optimization_level: Optional[onnxruntime.GraphOptimizationLevel] = None,
+    ):
         super().__init__()
-        # loading model will take about 1-3 seconds
-        self.model = OcrModel(model_path)
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.graph_optimization_level = graph_optimization_level
+        self._model: Optional[OcrModel] = None
+        self._model_lock = threading.Lock()
+        self._warm = False
+        self._warm_lock = threading.Lock()
+        self._batcher = _MicroBatcher(self._predict_bytes, batch_window, max_batch) if batch_window > 0 else None
+
+    @classmethod
+    def shared(cls) -> "CapchaOCR":
+        """
+        Get the process-wide default instance, so the model is loaded and kept in memory only once
+
+        Returns:
+            success (CapchaOCR): shared instance with the default model
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    @property
+    def model(self) -> OcrModel:
+        """Onnx model, loaded on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    # loading model will take about 1-3 seconds
+                    self._model = _OnnxOcrModel(self.model_path, self.session_options())
+        return self._model
+
+    def session_options(self) -> onnxruntime.SessionOptions:
+        """
+        Build the onnxruntime session options used to load the model
+
+        Returns:
+            success (onnxruntime.SessionOptions): session options with the configured threads and optimization level
+        """
+        options = onnxruntime.SessionOptions()
+        if self.intra_op_threads is not None:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads is not None:
+            options.inter_op_num_threads = self.inter_op_threads
+        if self.graph_optimization_level is not None:
+            options.graph_optimization_level = self.graph_optimization_level
+        return options
+
+    @classmethod
+    def quantize_model(cls, output_path: str, calibration_images: list[bytes], model_path: Optional[str] = None) -> str:
+        """
+        Save an int8 quantized copy of a model, about 4 times smaller and faster on CPU,
+        needs the `onnx` package ( `pip install mbbank-lib[quantize]` )
+
+        The model is a convolution network so it's quantized statically, activation ranges are calibrated
+        on real capchas to keep the accuracy ( e.g. a few dozen images from `MBBank.get_capcha_image` ).
+
+        Args:
+            output_path (str): path to save the quantized model
+            calibration_images (list[bytes]): capcha images input as bytes
+            model_path (str, optional): path to the model to quantize. Defaults to the model of mb-capcha-ocr.
+
+        Returns:
+            success (str): `output_path`, to pass as `model_path`
+
+        Raises:
+            ImportError: if `onnx` is not installed
+            ValueError: if `calibration_images` is empty
+        """
+        try:
+            from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+        except ImportError as e:
+            raise ImportError("onnx is not installed, please install it with `pip install mbbank-lib[quantize]`") from e
+        if not calibration_images:
+            raise ValueError("calibration_images must not be empty")
+        model_path = model_path or DEFAULT_MODEL_PATH
+        input_name = onnxruntime.InferenceSession(model_path).get_inputs()[0].name
+
+        class _CalibrationReader(CalibrationDataReader):
+            def __init__(self):
+                self._inputs = iter(calibration_images)
+
+            def get_next(self) -> Optional[dict[str, np.ndarray]]:
+                img = next(self._inputs, None)
+                return None if img is None else {input_name: cls._preprocess([img])}
+
+        quantize_static(
+            model_path,
+            output_path,
+            _CalibrationReader(),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+        )
+        return output_path
+
+    def prewarm(self):
+        """
+        Load the model and run one blank inference so onnxruntime kernels are initialized,
+        only the first call does the work
+        """
+        if self._warm:
+            return
+        with self._warm_lock:
+            if self._warm:
+                return
+            self._predict(np.ones((1, 1, MODEL_INPUT_SIZE[1], MODEL_INPUT_SIZE[0]), dtype=np.float32))
+            self._warm = True
+
+    @staticmethod
+    def _preprocess(imgs: list[bytes]) -> np.ndarray:
+        # decode straight into one ( batch, 1, height, width ) float array, resizing only images of another size
+        pixels = np.empty((len(imgs), 1, MODEL_INPUT_SIZE[1], MODEL_INPUT_SIZE[0]), dtype=np.float32)
+        for i, img in enumerate(imgs):
+            with Image.open(io.BytesIO(img)) as image:
+                gray = image.convert("L")
+            if gray.size != MODEL_INPUT_SIZE:
+                gray = gray.resize(MODEL_INPUT_SIZE)
+            np.divide(np.asarray(gray), np.float32(255), out=pixels[i, 0])
+        return pixels
+
+    def _predict(self, pixels: np.ndarray) -> list[tuple[str, float]]:
+        # same as OcrModel.predict for a batch but keep the scores of each character
+        model = self.model
+        session = model.session
+        model_input = session.get_inputs()[0]
+        if model_input.shape[0] == 1:
+            # batch size is fixed in the model, run each image against the same session
+            logits = np.concatenate(
+                [session.run(None, {model_input.name: pixels[i : i + 1]})[0] for i in range(len(pixels))]
+            )
+        else:
+            logits = session.run(None, {model_input.name: pixels})[0]
+        probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs /= probs.sum(axis=-1, keepdims=True)
+        # probability every character is right
+        confidences = probs.max(axis=-1).prod(axis=-1)
+        return [
+            ("".join(model.chars[label] for label in labels), float(confidence))
+            for labels, confidence in zip(probs.argmax(axis=-1), confidences, strict=True)
+        ]
+
+    def _predict_bytes(self, imgs: list[bytes]) -> list[tuple[str, float]]:
+        return self._predict(self._preprocess(imgs))
 
     def process_image(self, img: bytes) -> str:
         """
@@ -69,12 +368,207 @@ class CapchaOCR(CapchaProcessing):
         Returns:
             success (str): text from image
         """
-        image = Image.open(io.BytesIO(img))
-        return self.model.predict(image)
+        return self._predict_bytes([img])[0][0]
 
     async def process_image_async(self, img: bytes) -> str:
         """
-        Async process image and return text
+        Async process image and return text, batched with concurrent calls when `batch_window` is set
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (str): text from image
+        """
+        return (await self.process_image_with_confidence_async(img))[0]
+
+    def process_image_with_confidence(self, img: bytes) -> tuple[str, float]:
+        """
+        Process image and return text with the probability every character is right
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (tuple[str, float]): text from image and confidence between 0 and 1
+        """
+        return self._predict_bytes([img])[0]
+
+    async def process_image_with_confidence_async(self, img: bytes) -> tuple[str, float]:
+        """
+        Async process image and return text with the probability every character is right,
+        batched with concurrent calls when `batch_window` is set
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (tuple[str, float]): text from image and confidence between 0 and 1
+        """
+        if self._batcher is not None:
+            return await asyncio.wrap_future(self._batcher.submit(img))
+        return await asyncio.to_thread(self.process_image_with_confidence, img)
+
+    def process_batch(self, images: list[bytes]) -> list[str]:
+        """
+        Process images together and return their text
+
+        Args:
+            images (list[bytes]): images input as bytes
+
+        Returns:
+            success (list[str]): text from each image in the same order
+        """
+        if not images:
+            return []
+        return [text for text, _ in self._predict_bytes(images)]
+
+    async def process_batch_async(self, images: list[bytes]) -> list[str]:
+        """
+        Async process images together and return their text
+
+        Args:
+            images (list[bytes]): images input as bytes
+
+        Returns:
+            success (list[str]): text from each image in the same order
+        """
+        return await asyncio.to_thread(self.process_batch, images)
+
+
+# OCR instance of a ProcessPoolCapchaOCR worker process
+_worker_ocr: Optional[CapchaOCR] = None
+
+
+def _init_worker(model_path: Optional[str], options: dict[str, Any]):
+    global _worker_ocr
+    _worker_ocr = CapchaOCR(model_path, **options)
+    _worker_ocr.prewarm()
+
+
+def _worker_process_image(img: bytes) -> str:
+    return _worker_ocr.process_image(img)
+
+
+def _worker_process_image_with_confidence(img: bytes) -> tuple[str, float]:
+    return _worker_ocr.process_image_with_confidence(img)
+
+
+def _worker_process_batch(images: list[bytes]) -> list[str]:
+    return _worker_ocr.process_batch(images)
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+class ProcessPoolCapchaOCR(CapchaProcessing):
+    """
+    Onnx based OCR running in worker processes with the model preloaded,
+    so capcha decoding and inference don't hold the GIL of the main process and scale with cores.
+
+    Worker processes are started on the first capcha ( or `prewarm` ), a crashed pool is started again
+    on the next capcha. Call `close` or use it as a context manager to stop the workers.
+
+    Workers are started with "spawn" by default, which imports the main module again in each worker,
+    so a script must create and use the pool under `if __name__ == "__main__":`, otherwise the module level
+    code runs again in every worker ( and a pool started there raises RuntimeError ).
+
+    Args:
+        workers (int, optional): number of worker processes. Defaults to the number of CPUs.
+        model_path (str, optional): path to a model file
+        intra_op_threads (int, optional): onnxruntime threads per operator in each worker, one by default
+        so the workers don't compete for the same cores. Defaults to 1.
+        inter_op_threads (int, optional): onnxruntime threads for independent operators in each worker
+        graph_optimization_level (onnxruntime.GraphOptimizationLevel, optional): graph optimizations applied
+        when the model is loaded
+        mp_context (multiprocessing.context.BaseContext, optional): multiprocessing context used to start workers.
+        Defaults to "spawn" as forking a process with onnxruntime threads running is not safe.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        model_path: Optional[str] = None,
+        mp_context: Optional[multiprocessing.context.BaseContext] = None,
+        *,
+        intra_op_threads: Optional[int] = 1,
+        inter_op_threads: Optional[int] = None,
+        graph_optimization_level: Optional[onnxruntime.GraphOptimizationLevel] = None,
+    ):
+        super().__init__()
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.graph_optimization_level = graph_optimization_level
+        self.mp_context = mp_context or multiprocessing.get_context("spawn")
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def __enter__(self) -> "ProcessPoolCapchaOCR":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Process pool, started on first use"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=self.mp_context,
+                        initializer=_init_worker,
+                        initargs=(
+                            self.model_path,
+                            {
+                                "intra_op_threads": self.intra_op_threads,
+                                "inter_op_threads": self.inter_op_threads,
+                                "graph_optimization_level": self.graph_optimization_level,
+                            },
+                        ),
+                    )
+        return self._executor
+
+    def _submit(self, fn: Callable, *args) -> concurrent.futures.Future:
+        executor = self.executor
+        try:
+            return executor.submit(fn, *args)
+        except concurrent.futures.process.BrokenProcessPool:
+            # a worker died, drop the broken pool and start a new one
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return self.executor.submit(fn, *args)
+
+    def prewarm(self):
+        """
+        Start every worker process and wait until their model is loaded
+        """
+        futures = [self._submit(_worker_ready) for _ in range(self.workers)]
+        concurrent.futures.wait(futures)
+
+    def process_image(self, img: bytes) -> str:
+        """
+        Process image in a worker process and return text
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (str): text from image
+        """
+        return self._submit(_worker_process_image, img).result()
+
+    async def process_image_async(self, img: bytes) -> str:
+        """
+        Async process image in a worker process and return text
 
         Args:
             img (bytes): image input as bytes
@@ -82,4 +576,67 @@ class CapchaOCR(CapchaProcessing):
         Returns:
             success (str): text from image
         """
-        return await asyncio.to_thread(self.process_image, img)
+        return await asyncio.wrap_future(self._submit(_worker_process_image, img))
+
+    def process_image_with_confidence(self, img: bytes) -> tuple[str, float]:
+        """
+        Process image in a worker process and return text with the probability every character is right
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (tuple[str, float]): text from image and confidence between 0 and 1
+        """
+        return self._submit(_worker_process_image_with_confidence, img).result()
+
+    async def process_image_with_confidence_async(self, img: bytes) -> tuple[str, float]:
+        """
+        Async process image in a worker process and return text with the probability every character is right
+
+        Args:
+            img (bytes): image input as bytes
+
+        Returns:
+            success (tuple[str, float]): text from image and confidence between 0 and 1
+        """
+        return await asyncio.wrap_future(self._submit(_worker_process_image_with_confidence, img))
+
+    def _submit_batch(self, images: list[bytes]) -> list[concurrent.futures.Future]:
+        # one chunk per worker so each of them run a single batch
+        size = max(1, -(-len(images) // self.workers))
+        return [self._submit(_worker_process_batch, images[i : i + size]) for i in range(0, len(images), size)]
+
+    def process_batch(self, images: list[bytes]) -> list[str]:
+        """
+        Process images split between the worker processes and return their text
+
+        Args:
+            images (list[bytes]): images input as bytes
+
+        Returns:
+            success (list[str]): text from each image in the same order
+        """
+        return [text for future in self._submit_batch(images) for text in future.result()]
+
+    async def process_batch_async(self, images: list[bytes]) -> list[str]:
+        """
+        Async process images split between the worker processes and return their text
+
+        Args:
+            images (list[bytes]): images input as bytes
+
+        Returns:
+            success (list[str]): text from each image in the same order
+        """
+        chunks = await asyncio.gather(*(asyncio.wrap_future(future) for future in self._submit_batch(images)))
+        return [text for chunk in chunks for text in chunk]
+
+    def close(self):
+        """
+        Stop the worker processes, they are started again if another capcha is processed
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
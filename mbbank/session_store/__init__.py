@@ -0,0 +1,5 @@
+from .base import SessionState, SessionStore
+from .file_store import FileSessionStore
+from .sqlite_store import SQLiteSessionStore
+
+__all__ = ["FileSessionStore", "SQLiteSessionStore", "SessionState", "SessionStore"]
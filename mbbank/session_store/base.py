@@ -0,0 +1,237 @@
+import asyncio
+import time
+import typing
+
+from pydantic import BaseModel, Field
+
+
+class SessionState(BaseModel):
+    """
+    Logged in session state that can be saved and restored to skip capcha login
+
+    Attributes:
+        username (str): MBBank Account Username the session belongs to
+        sessionId (str): Session id
+        deviceIdCommon (str): Device id common the session was created with
+        userinfo (dict): raw login response used by `userinfo()`
+        timestamp (float): unix time when the session was created
+    """
+
+    username: str
+    sessionId: str
+    deviceIdCommon: str
+    userinfo: dict[str, typing.Any]
+    timestamp: float = Field(default_factory=time.time)
+
+
+class SessionStore:
+    """
+    Base class for session store for self-implemented
+
+    Examples:
+    ```py
+    class MySessionStore(SessionStore):
+        def load(self, username: str) -> Optional[SessionState]:
+            # return saved session state or None
+            return None
+
+        def save(self, state: SessionState):
+            # save session state
+            pass
+
+        def clear(self, username: str):
+            # remove saved session state
+            pass
+    ```
+
+    Stores shared between processes should also implement `acquire_lease` and `release_lease` so only one process
+    does the capcha login at a time while the others wait and adopt the saved session,
+    the default lease is always granted which is enough for a store used by a single process.
+
+    Stores should also implement `load_device_id` and `save_device_id` so an account keep the same device id
+    across restarts, the default does not persist it and a new device id is generated every time.
+
+    Note: async methods run the sync ones in a thread by default, override them for a native async implementation.
+
+    Args:
+        lease_ttl (float, optional): seconds a login lease is held before it's considered abandoned,
+        must be longer than a capcha login. Defaults to 60.
+        poll_interval (float, optional): seconds between checks while waiting for another process to login. Defaults to 0.5.
+    """
+
+    lease_ttl: float = 60
+    poll_interval: float = 0.5
+
+    def __init__(self, *, lease_ttl: float = 60, poll_interval: float = 0.5):
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+
+    def load(self, username: str) -> typing.Optional[SessionState]:
+        """
+        Load saved session state
+
+        Args:
+            username (str): MBBank Account Username
+
+        Returns:
+            success (SessionState or None): saved session state or None if nothing saved
+        """
+        raise NotImplementedError("load is not implemented")
+
+    def save(self, state: SessionState):
+        """
+        Save session state
+
+        Args:
+            state (SessionState): session state to save
+        """
+        raise NotImplementedError("save is not implemented")
+
+    def clear(self, username: str):
+        """
+        Remove saved session state
+
+        Args:
+            username (str): MBBank Account Username
+        """
+        raise NotImplementedError("clear is not implemented")
+
+    def invalidate(self, username: str, session_id: str):
+        """
+        Remove saved session state only if it's still the given session, so a session another process
+        just saved is not removed by a process that saw the old one rejected.
+
+        Args:
+            username (str): MBBank Account Username
+            session_id (str): session id rejected by the server
+        """
+        state = self.load(username)
+        if state is not None and state.sessionId == session_id:
+            self.clear(username)
+
+    def acquire_lease(self, username: str) -> bool:
+        """
+        Try to acquire the login lease for an account without blocking
+
+        Args:
+            username (str): MBBank Account Username
+
+        Returns:
+            success (bool): True if this store instance now holds the lease
+        """
+        return True
+
+    def release_lease(self, username: str):
+        """
+        Release the login lease acquired with `acquire_lease`
+
+        Args:
+            username (str): MBBank Account Username
+        """
+
+    def load_device_id(self, username: str) -> typing.Optional[str]:
+        """
+        Load device id saved for an account, it's kept when the session is cleared
+
+        Args:
+            username (str): MBBank Account Username
+
+        Returns:
+            success (str or None): saved device id or None if nothing saved
+        """
+        return None
+
+    def save_device_id(self, username: str, device_id: str):
+        """
+        Save device id of an account
+
+        Args:
+            username (str): MBBank Account Username
+            device_id (str): device id common
+        """
+
+    async def load_async(self, username: str) -> typing.Optional[SessionState]:
+        """
+        Async load saved session state
+
+        Args:
+            username (str): MBBank Account Username
+
+        Returns:
+            success (SessionState or None): saved session state or None if nothing saved
+        """
+        return await asyncio.to_thread(self.load, username)
+
+    async def save_async(self, state: SessionState):
+        """
+        Async save session state
+
+        Args:
+            state (SessionState): session state to save
+        """
+        await asyncio.to_thread(self.save, state)
+
+    async def clear_async(self, username: str):
+        """
+        Async remove saved session state
+
+        Args:
+            username (str): MBBank Account Username
+        """
+        await asyncio.to_thread(self.clear, username)
+
+    async def invalidate_async(self, username: str, session_id: str):
+        """
+        Async remove saved session state only if it's still the given session
+
+        Args:
+            username (str): MBBank Account Username
+            session_id (str): session id rejected by the server
+        """
+        await asyncio.to_thread(self.invalidate, username, session_id)
+
+    async def acquire_lease_async(self, username: str) -> bool:
+        """
+        Async try to acquire the login lease for an account without blocking
+
+        Args:
+            username (str): MBBank Account Username
+
+        Returns:
+            success (bool): True if this store instance now holds the lease
+        """
+        return await asyncio.to_thread(self.acquire_lease, username)
+
+    async def release_lease_async(self, username: str):
+        """
+        Async release the login lease acquired with `acquire_lease_async`
+
+        Args:
+            username (str): MBBank Account Username
+        """
+        await asyncio.to_thread(self.release_lease, username)
+
+    async def load_device_id_async(self, username: str) -> typing.Optional[str]:
+        """
+        Async load device id saved for an account
+
+        Args:
+            username (str): MBBank Account Username
+
+        Returns:
+            success (str or None): saved device id or None if nothing saved
+        """
+        return await asyncio.to_thread(self.load_device_id, username)
+
+    async def save_device_id_async(self, username: str, device_id: str):
+        """
+        Async save device id of an account
+
+        Args:
+            username (str): MBBank Account Username
+            device_id (str): device id common
+        """
+        await asyncio.to_thread(self.save_device_id, username, device_id)
+
+
+__all__ = ["SessionState", "SessionStore"]
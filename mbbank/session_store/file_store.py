@@ -0,0 +1,120 @@
+import contextlib
+import hashlib
+import json
+import os
+import time
+import typing
+import uuid
+
+import pydantic
+
+from .base import SessionState, SessionStore
+
+
+class FileSessionStore(SessionStore):
+    """
+    Session store saving one json file per account in a directory,
+    login lease is a lock file created exclusively so the directory can be shared between processes on the same host.
+
+    Note: saved files contain a live session id, keep the directory private.
+    taking over an abandoned lease is best effort, use `SQLiteSessionStore` if many processes start at once.
+
+    Args:
+        directory (str or os.PathLike): directory to save session files, created if not exists
+        lease_ttl (float, optional): seconds a login lease is held before it's considered abandoned. Defaults to 60.
+        poll_interval (float, optional): seconds between checks while waiting for another process to login. Defaults to 0.5.
+    """
+
+    def __init__(self, directory: str | os.PathLike, *, lease_ttl: float = 60, poll_interval: float = 0.5):
+        super().__init__(lease_ttl=lease_ttl, poll_interval=poll_interval)
+        self.directory = os.fspath(directory)
+        self._lease_tokens: dict[str, str] = {}
+
+    def _path(self, username: str) -> str:
+        # hash username so the account name is not leaked through the file name
+        name = hashlib.sha256(username.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _lock_path(self, username: str) -> str:
+        return self._path(username)[: -len(".json")] + ".lock"
+
+    def _device_path(self, username: str) -> str:
+        return self._path(username)[: -len(".json")] + ".device"
+
+    def _write_private(self, path: str, data: str):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        # atomic replace so readers never see a half written file
+        os.replace(tmp_path, path)
+
+    def _read_lock(self, path: str) -> typing.Optional[dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            # missing or still being written by its owner
+            return None
+
+    def load(self, username: str) -> typing.Optional[SessionState]:
+        try:
+            with open(self._path(username), encoding="utf-8") as f:
+                state = SessionState.model_validate_json(f.read())
+        except (FileNotFoundError, pydantic.ValidationError):
+            return None
+        if state.username != username:
+            return None
+        return state
+
+    def save(self, state: SessionState):
+        self._write_private(self._path(state.username), state.model_dump_json())
+
+    def clear(self, username: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(username))
+
+    def load_device_id(self, username: str) -> typing.Optional[str]:
+        try:
+            with open(self._device_path(username), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save_device_id(self, username: str, device_id: str):
+        self._write_private(self._device_path(username), device_id)
+
+    def acquire_lease(self, username: str) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._lock_path(username)
+        token = uuid.uuid4().hex
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                lock = self._read_lock(path)
+                if lock is None or lock["expires"] > time.time():
+                    return False
+                # owner died while holding the lease, take it over
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"token": token, "expires": time.time() + self.lease_ttl}))
+            self._lease_tokens[username] = token
+            return True
+        return False
+
+    def release_lease(self, username: str):
+        token = self._lease_tokens.pop(username, None)
+        if token is None:
+            return
+        path = self._lock_path(username)
+        lock = self._read_lock(path)
+        if lock is not None and lock["token"] == token:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+__all__ = ["FileSessionStore"]
@@ -0,0 +1,112 @@
+import contextlib
+import os
+import sqlite3
+import time
+import typing
+import uuid
+
+import pydantic
+
+from .base import SessionState, SessionStore
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by a SQLite database file, sessions and login leases are updated in transactions
+    so one database can be shared by many processes on the same host ( e.g. gunicorn workers ).
+
+    Note: the database contains live session ids, keep the file private.
+
+    Args:
+        path (str or os.PathLike): database file path, created if not exists
+        lease_ttl (float, optional): seconds a login lease is held before it's considered abandoned. Defaults to 60.
+        poll_interval (float, optional): seconds between checks while waiting for another process to login. Defaults to 0.5.
+    """
+
+    def __init__(self, path: str | os.PathLike, *, lease_ttl: float = 60, poll_interval: float = 0.5):
+        super().__init__(lease_ttl=lease_ttl, poll_interval=poll_interval)
+        self.path = os.fspath(path)
+        self._lease_tokens: dict[str, str] = {}
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (username TEXT PRIMARY KEY, session_id TEXT NOT NULL, state TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases (username TEXT PRIMARY KEY, token TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS devices (username TEXT PRIMARY KEY, device_id TEXT NOT NULL)")
+
+    @contextlib.contextmanager
+    def _connect(self) -> typing.Iterator[sqlite3.Connection]:
+        # autocommit mode, transactions are opened explicitly where needed
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def load(self, username: str) -> typing.Optional[SessionState]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT state FROM sessions WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return SessionState.model_validate_json(row[0])
+        except pydantic.ValidationError:
+            return None
+
+    def save(self, state: SessionState):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (username, session_id, state) VALUES (?, ?, ?)",
+                (state.username, state.sessionId, state.model_dump_json()),
+            )
+
+    def clear(self, username: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE username = ?", (username,))
+
+    def invalidate(self, username: str, session_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE username = ? AND session_id = ?", (username, session_id))
+
+    def load_device_id(self, username: str) -> typing.Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT device_id FROM devices WHERE username = ?", (username,)).fetchone()
+        return None if row is None else row[0]
+
+    def save_device_id(self, username: str, device_id: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO devices (username, device_id) VALUES (?, ?)", (username, device_id))
+
+    def acquire_lease(self, username: str) -> bool:
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            # take the write lock up front so check and insert are atomic between processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT expires FROM leases WHERE username = ?", (username,)).fetchone()
+                if row is not None and row[0] > now:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.execute(
+                    "INSERT OR REPLACE INTO leases (username, token, expires) VALUES (?, ?, ?)",
+                    (username, token, now + self.lease_ttl),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._lease_tokens[username] = token
+        return True
+
+    def release_lease(self, username: str):
+        token = self._lease_tokens.pop(username, None)
+        if token is None:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE username = ? AND token = ?", (username, token))
+
+
+__all__ = ["SQLiteSessionStore"]
@@ -79,10 +79,9 @@ class BulkTransferContext(BulkTransferContextBase):
         Raises:
             BankNotFoundError: if bank code not found in bank list
         """
-        bank_list = self.mbbank.getBankList()
-        for bank in bank_list.listBank:
-            if bank.smlCode == account.benBankCode:
-                return bank
+        bank = self.mbbank.getBankDirectory().by_sml_code(account.benBankCode)
+        if bank is not None:
+            return bank
         raise BankNotFoundError("Bank code not found in bank list")
 
     def verify_transfer(self) -> BulkTransferResponseModal:
@@ -103,7 +102,7 @@ class BulkTransferContext(BulkTransferContextBase):
             "sourceNumber": self.src_account,
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail-bulkpaymentms/v1.0/verify-bulk-payment",
+            "/api/retail-bulkpaymentms/v1.0/verify-bulk-payment",
             json=json_data,
             encrypt=True,
         )
@@ -129,7 +128,7 @@ class BulkTransferContext(BulkTransferContextBase):
             "serviceCode": "BULK_TRANSFER",
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/internetbanking/getAuthList",
+            "/api/retail_web/internetbanking/getAuthList",
             json=json_data,
             encrypt=True,
         )
@@ -164,7 +163,7 @@ class BulkTransferContext(BulkTransferContextBase):
             }
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/vtap/createTransactionAuthen",
+            "/api/retail_web/vtap/createTransactionAuthen",
             json=json_data,
             encrypt=True,
         )
@@ -198,7 +197,7 @@ class BulkTransferContext(BulkTransferContextBase):
             "otp": otp_crafted,
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail-bulkpaymentms/v1.0/make-bulk-payment",
+            "/api/retail-bulkpaymentms/v1.0/make-bulk-payment",
             json=json_data,
             encrypt=True,
         )
@@ -1,11 +1,24 @@
 import base64
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import functools
 import hashlib
+import os
+import threading
+import time
 import typing
 
-import requests
-
-from mbbank.base import MBBankBase
+from mbbank.base import (
+    AdaptivePollInterval,
+    BackfillProgress,
+    BalanceGate,
+    BankDirectory,
+    HistoryWindows,
+    MBBankBase,
+    SeenSet,
+)
 from mbbank.capcha_ocr import CapchaProcessing
 from mbbank.encryption_backend import EncryptionBackend
 from mbbank.errors import (
@@ -22,12 +35,12 @@ from mbbank.modals import (
     ATMCardIDResponseModal,
     BalanceLoyaltyResponseModal,
     BalanceResponseModal,
-    Bank,
     BankListResponseModal,
     BeneficiaryListResponseModal,
     BulkPaymentDetailResponseModal,
     BulkPaymentStatusResponseModal,
     CardListResponseModal,
+    CardTransaction,
     CardTransactionsResponseModal,
     InterestRateResponseModal,
     LoanListResponseModal,
@@ -35,13 +48,41 @@ from mbbank.modals import (
     SavingDetailResponseModal,
     SavingListResponseModal,
     ServiceTokenResponseModal,
+    Transaction,
     TransactionHistoryResponseModal,
     UserInfoResponseModal,
 )
+from mbbank.session_store import SessionStore
+from mbbank.transaction_store import TransactionStore
+from mbbank.transport import RequestsTransport, Transport
 
 from .bulk_transfer import BulkTransferContext
 from .transfer import TransferContext
 
+_F = typing.TypeVar("_F", bound=typing.Callable[..., typing.Any])
+_T = typing.TypeVar("_T")
+
+
+def _cached(func: _F) -> _F:
+    # serve responses from the cache for methods listed in cache_ttl, expired ones are refreshed in background
+    @functools.wraps(func)
+    def wrapper(self: "MBBank", *args, **kwargs):
+        key = self._cache_key(func.__name__, args, kwargs)
+        if key is None:
+            return func(self, *args, **kwargs)
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry.fresh_until <= time.monotonic() and self._cache.begin_refresh(key):
+                threading.Thread(
+                    target=self._revalidate_cache, args=(key, func, args, kwargs), name="mbbank-cache", daemon=True
+                ).start()
+            return entry.value
+        value = func(self, *args, **kwargs)
+        self._cache.set(key, value, self.cache_ttl[func.__name__], self.cache_stale_ttl)
+        return value
+
+    return typing.cast(_F, wrapper)
+
 
 class MBBank(MBBankBase):
     """Core class
@@ -49,15 +90,44 @@ class MBBank(MBBankBase):
     Attributes:
         deviceIdCommon (str): Device id common
         sessionId (str or None): Current Session id
+        keepalive_error (Exception or None): error that stopped the background keep-alive
 
     Args:
         username (str): MBBank Account Username
         password (str): MBBank Account Password
         proxy (str, optional): Proxy url. Example: "http://127.0.0.1:8080". Defaults to None.
-        ocr_class (CapchaProcessing, optional): instance of CapchaProcessing class. Defaults to CapchaOCR().
+        ocr_class (CapchaProcessing, optional): instance of CapchaProcessing class. Defaults to CapchaOCR.shared() ( loaded once per process on the first capcha ).
         encryption_backend (EncryptionBackend, optional): encryption backend to encrypt request data, this will affect the login flow, if you have problem with login flow try to change this value.
         retry_times (int, optional): number of retry times for capcha processing. Defaults to 30 ( worst case ).
         timeout (Union[float, Tuple[float, float]], optional): request timeout in seconds or (connect timeout, read timeout) or None for no timeout. Defaults to None.
+        pool_connections (int, optional): number of host connection pools to cache. Defaults to 10.
+        pool_maxsize (int, optional): maximum number of connections kept per host pool. Defaults to 10.
+        max_retries (int, optional): number of retries on connection errors ( request not sent yet so safe to retry ). Defaults to 3.
+        transport (Transport, optional): http transport to send requests, when set proxy, timeout and pool options are ignored. Defaults to RequestsTransport().
+        session_store (SessionStore, optional): store to save the session after login and restore it before doing a capcha login,
+        e.g. FileSessionStore to skip capcha login after restart or SQLiteSessionStore to share one session between processes. Defaults to None.
+        prefetch_capcha (bool, optional): keep one capcha already solved in background so a login again costs a single login request. Defaults to False.
+        capcha_max_age (float, optional): seconds a prefetched capcha is considered valid. Defaults to 60.
+        capcha_min_confidence (float, optional): OCR confidence between 0 and 1 under which a new capcha is fetched
+        instead of trying to login with it, needs an `ocr_class` returning a confidence like CapchaOCR. Defaults to 0.
+        device_id (str, optional): device id common to use, when not set a new one is generated
+        or the one saved in `session_store` for this account is reused. Defaults to None.
+        cache_ttl (dict[str, float], optional): seconds the response of each read method is cached by method name,
+        merged over `MBBankBase.CACHE_TTL` ( bank list, interest rate and card list ), 0 to not cache a method.
+        Defaults to `MBBankBase.CACHE_TTL`.
+        cache_stale_ttl (float, optional): extra seconds an expired response is still returned while it's refreshed
+        in background ( stale-while-revalidate ). Defaults to 60.
+        cache_size (int, optional): maximum number of cached responses, least recently used are evicted first. Defaults to 256.
+        cache_dir (str or os.PathLike, optional): directory to persist reference data ( bank list, interest rate )
+        so a new process serve them without login, can be shared by accounts. Defaults to None.
+        disk_cache_ttl (dict[str, float], optional): seconds the response of each method is kept in `cache_dir`
+        by method name. Defaults to `MBBankBase.DISK_CACHE_TTL`.
+        prewarm_ocr (bool, optional): load and initialize the OCR model in a background thread right away,
+        a login meanwhile only waits for what is left of it. Defaults to False.
+        history_cache (bool, optional): fetch only the days missing when `getTransactionAccountHistory` is called
+        with overlapping ranges, today is refetched after `MBBankBase.HISTORY_CACHE_TODAY_TTL` seconds. Defaults to False.
+
+    Note: The default transport keeps a pooled `requests.Session`, use `with MBBank(...)` or call `close()` when done to release the connections.
     """
 
     def __init__(
@@ -70,32 +140,156 @@ class MBBank(MBBankBase):
         encryption_backend: typing.Optional[EncryptionBackend] = None,
         retry_times: int = 30,
         timeout: float | tuple[float, float] | None = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        max_retries: int = 3,
+        transport: typing.Optional[Transport] = None,
+        session_store: typing.Optional[SessionStore] = None,
+        prefetch_capcha: bool = False,
+        capcha_max_age: float = 60,
+        capcha_min_confidence: float = 0,
+        device_id: typing.Optional[str] = None,
+        cache_ttl: typing.Optional[dict[str, float]] = None,
+        cache_stale_ttl: float = 60,
+        cache_size: int = 256,
+        cache_dir: str | os.PathLike | None = None,
+        disk_cache_ttl: typing.Optional[dict[str, float]] = None,
+        history_cache: bool = False,
+        prewarm_ocr: bool = False,
     ):
+        if transport is None:
+            transport = RequestsTransport(
+                proxy=proxy,
+                timeout=timeout,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=max_retries,
+            )
         super().__init__(
             username=username,
             password=password,
             ocr_class=ocr_class,
             encryption_backend=encryption_backend,
             retry_times=retry_times,
+            transport=transport,
+            session_store=session_store,
+            prefetch_capcha=prefetch_capcha,
+            capcha_max_age=capcha_max_age,
+            capcha_min_confidence=capcha_min_confidence,
+            device_id=device_id,
+            cache_ttl=cache_ttl,
+            cache_stale_ttl=cache_stale_ttl,
+            cache_size=cache_size,
+            cache_dir=cache_dir,
+            disk_cache_ttl=disk_cache_ttl,
+            history_cache=history_cache,
+            prewarm_ocr=prewarm_ocr,
+        )
+        self._keepalive_thread: typing.Optional[threading.Thread] = None
+        self._keepalive_stop = threading.Event()
+        self._capcha_thread: typing.Optional[threading.Thread] = None
+        self._capcha_lock = threading.Lock()
+        # thread holding _capcha_lock during a login, a login started again from it must not wait on the lock
+        self._capcha_owner: typing.Optional[int] = None
+        self._capcha_wakeup = threading.Event()
+        self._capcha_stop = threading.Event()
+
+    def _revalidate_cache(self, key: tuple, func: typing.Callable, args: tuple, kwargs: dict):
+        try:
+            # on error keep serving the stale response, the next call after it expires will raise the error
+            with contextlib.suppress(Exception):
+                value = func(self, *args, **kwargs)
+                self._cache.set(key, value, self.cache_ttl[key[0]], self.cache_stale_ttl)
+        finally:
+            self._cache.end_refresh(key)
+
+    def __enter__(self) -> "MBBank":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Close transport http connections and stop background keep-alive,
+        the client can still be used after this and will reconnect on demand
+        """
+        self.stop_keepalive()
+        self._stop_capcha_prefetch()
+        self.transport.close()
+
+    def start_keepalive(
+        self, *, interval: float = 60, max_age: typing.Optional[float] = None, max_failures: typing.Optional[int] = 5
+    ):
+        """
+        Start a daemon thread that keeps the session alive so hot path calls don't pay for a login,
+        it sends a cheap request after `interval` seconds without any request and logs in again
+        ahead of expiry once the session is older than `max_age` seconds.
+
+        Args:
+            interval (float, optional): idle seconds before a keep-alive request. Defaults to 60.
+            max_age (float, optional): session age in seconds to proactively login again, None to only
+            login again when the server reject the session. Defaults to None.
+            max_failures (int, optional): consecutive failed keep-alive actions before it stops and saves the error
+            in `keepalive_error`, retries wait `interval` doubled after each failure. None to never stop. Defaults to 5.
+        """
+        if self._keepalive_thread is not None and self._keepalive_thread.is_alive():
+            return
+        self._keepalive_stop.clear()
+        self.keepalive_error = None
+        self._keepalive_thread = threading.Thread(
+            target=self._keepalive_loop,
+            args=(interval, max_age, max_failures),
+            name="mbbank-keepalive",
+            daemon=True,
         )
-        if proxy is not None:
-            proxy_protocol = proxy.split("://")[0]
-            self.proxy = {proxy_protocol: proxy}
-        else:
-            self.proxy = {}
-        self.timeout = timeout
-
-    def _req(self, url, *, json=None, headers=None, encrypt: bool = False) -> dict:
+        self._keepalive_thread.start()
+
+    def stop_keepalive(self):
+        """
+        Stop background keep-alive started by `start_keepalive`
+        """
+        self._keepalive_stop.set()
+        if self._keepalive_thread is not None and self._keepalive_thread is not threading.current_thread():
+            self._keepalive_thread.join()
+        self._keepalive_thread = None
+
+    def _keepalive_loop(self, interval: float, max_age: typing.Optional[float], max_failures: typing.Optional[int]):
+        failures = 0
+        while not self._keepalive_stop.is_set():
+            delay, action = self._next_keepalive_action(interval, max_age)
+            if action is None:
+                self._keepalive_stop.wait(delay)
+                continue
+            # errors are not fatal here, the next hot path call will surface them
+            try:
+                if action == "refresh":
+                    self._ensure_authenticated(self.sessionId)
+                else:
+                    self._req(self.KEEPALIVE_PATH)
+            except Exception as e:
+                failures += 1
+                if max_failures is not None and failures >= max_failures:
+                    self.keepalive_error = e
+                    return
+                self._keepalive_stop.wait(self._keepalive_retry_delay(interval, failures))
+                continue
+            failures = 0
+            self._keepalive_stop.wait(min(interval, 1))
+
+    def _req(self, path, *, json=None, headers=None, encrypt: bool = False) -> dict:
         if headers is None:
             headers = {}
         if json is None:
             json = {}
         while True:
-            if self.sessionId is None:
-                self._authenticate()
+            session_id = self.sessionId
+            if session_id is None:
+                self._ensure_authenticated()
+                session_id = self.sessionId
             rid = f"{self._userid}-{self._get_now_time()}"
             json_data = {
-                "sessionId": self.sessionId if self.sessionId is not None else "",
+                "sessionId": session_id if session_id is not None else "",
                 "refNo": rid,
                 "deviceIdCommon": self.deviceIdCommon,
             }
@@ -107,24 +301,19 @@ class MBBank(MBBankBase):
             if encrypt:
                 data_encrypt = self.encryption_backend._encrypt(json_data)
                 json_data = {"dataEnc": data_encrypt}
-            with requests.post(
-                url,
-                headers=headers,
-                json=json_data,
-                proxies=self.proxy,
-                timeout=self.timeout,
-            ) as r:
-                if r.status_code == 428:
-                    raise CryptoVerifyError(r.text, r.headers.get("Content-Type", ""))
-                data_out = r.json()
+            r = self.transport.post(path, headers=headers, json=json_data)
+            if r.status == 428:
+                raise CryptoVerifyError(r.text, r.content_type)
+            data_out = r.json()
             if data_out["result"] is None:
-                self.getBalance()
+                self._fetch_balance()
             # Some endpoints return {"result": {"ok": true}}, others return {"result": {"result": true}}
             elif data_out["result"].get("ok", False) or data_out["result"].get("result", False):
                 data_out.pop("result", None)
+                self._last_request_at = time.time()
                 break
             elif data_out["result"]["responseCode"] == "GW200":
-                self._authenticate()
+                self._ensure_authenticated(session_id)
             else:
                 raise MBBankAPIError(data_out["result"])
         return data_out
@@ -146,17 +335,11 @@ class MBBank(MBBankBase):
         headers["X-Request-Id"] = rid
         headers["Deviceid"] = self.deviceIdCommon
         headers["Refno"] = rid
-        with requests.post(
-            "https://online.mbbank.com.vn/api/retail-internetbankingms/getCaptchaImage",
-            headers=headers,
-            json=json_data,
-            proxies=self.proxy,
-            timeout=self.timeout,
-        ) as r:
-            if r.status_code == 428:
-                raise CryptoVerifyError(r.text, r.headers.get("Content-Type", ""))
-            data_out = r.json()
-            return base64.b64decode(data_out["imageString"])
+        r = self.transport.post("/api/retail-internetbankingms/getCaptchaImage", headers=headers, json=json_data)
+        if r.status == 428:
+            raise CryptoVerifyError(r.text, r.content_type)
+        data_out = r.json()
+        return base64.b64decode(data_out["imageString"])
 
     def login(self, captcha_text: str):
         """
@@ -178,18 +361,17 @@ class MBBank(MBBankBase):
             "ibAuthen2faString": self.FPR,
         }
         data_encrypt = self.encryption_backend._encrypt(payload)
-        with requests.post(
-            "https://online.mbbank.com.vn/api/retail_web/internetbanking/v2.0/doLogin",
+        r = self.transport.post(
+            "/api/retail_web/internetbanking/v2.0/doLogin",
             headers=self.HEADERS_DEFAULT,
             json={"dataEnc": data_encrypt},
-            proxies=self.proxy,
-            timeout=self.timeout,
-        ) as r:
-            if r.status_code == 428:
-                raise CryptoVerifyError(r.text, r.headers.get("Content-Type", ""))
-            data_out = r.json()
+        )
+        if r.status == 428:
+            raise CryptoVerifyError(r.text, r.content_type)
+        data_out = r.json()
         if data_out["result"]["ok"]:
             self.sessionId = data_out["sessionId"]
+            self._session_created_at = time.time()
             data_out.pop("result", None)
             self._userinfo = data_out
             self._verify_biometric_check()
@@ -197,25 +379,198 @@ class MBBank(MBBankBase):
         raise MBBankAPIError(data_out["result"])
 
     def _verify_biometric_check(self):
-        self._req("https://online.mbbank.com.vn/api/retail-go-ekycms/v1.0/verify-biometric-nfc-transaction")
+        self._req("/api/retail-go-ekycms/v1.0/verify-biometric-nfc-transaction")
+
+    def _ensure_authenticated(self, stale_session_id: typing.Optional[str] = None):
+        # single-flight login, callers that waited on the lock reuse the session created by the first one
+        if self._auth_owner == threading.get_ident():
+            # re-entered from inside login (biometric check), this thread already holds the session store lease
+            self._authenticate()
+            return
+        with self._auth_lock:
+            if not self._need_authenticate(stale_session_id):
+                return
+            self._auth_owner = threading.get_ident()
+            try:
+                if self.session_store is None:
+                    self._authenticate()
+                else:
+                    self._authenticate_shared(self.session_store, stale_session_id)
+            finally:
+                self._auth_owner = None
+
+    def _authenticate_shared(self, store: SessionStore, stale_session_id: typing.Optional[str]):
+        # cross-process single-flight, the lease holder logs in and the others adopt the session it saves
+        if stale_session_id is not None:
+            store.invalidate(self._userid, stale_session_id)
+        deadline = time.monotonic() + store.lease_ttl
+        while True:
+            if self._restore_session(store.load(self._userid), stale_session_id):
+                return
+            if store.acquire_lease(self._userid) or time.monotonic() > deadline:
+                break  # past the deadline the lease holder looks stuck, login by ourself
+            time.sleep(store.poll_interval)
+        try:
+            # the previous holder may have saved a session right before releasing the lease
+            if self._restore_session(store.load(self._userid), stale_session_id):
+                return
+            # keep the device id of this account stable across restarts and processes
+            if self._adopt_device_id(store.load_device_id(self._userid)):
+                store.save_device_id(self._userid, self.deviceIdCommon)
+            self._authenticate()
+            store.save(self.export_session())
+        finally:
+            store.release_lease(self._userid)
+
+    def _solve_capcha(self, force: bool = False) -> typing.Optional[str]:
+        # None when the OCR is not confident enough, a new capcha is cheaper than a failed login
+        img_bytes = self.get_capcha_image()
+        if self.capcha_min_confidence <= 0:
+            return self.ocr_class.process_image(img_bytes)
+        text, confidence = self.ocr_class.process_image_with_confidence(img_bytes)
+        return text if force or confidence >= self.capcha_min_confidence else None
+
+    def _start_capcha_prefetch(self):
+        if self._capcha_thread is not None and self._capcha_thread.is_alive():
+            return
+        self._capcha_stop.clear()
+        self._capcha_thread = threading.Thread(target=self._capcha_prefetch_loop, name="mbbank-capcha", daemon=True)
+        self._capcha_thread.start()
+
+    def _stop_capcha_prefetch(self):
+        self._capcha_stop.set()
+        self._capcha_wakeup.set()
+        if self._capcha_thread is not None:
+            self._capcha_thread.join()
+        self._capcha_thread = None
+
+    def _capcha_prefetch_loop(self):
+        while not self._capcha_stop.is_set():
+            self._capcha_wakeup.clear()
+            delay = self._capcha_refill_delay()
+            if delay > 0:
+                # sleep until the buffered capcha gets old or is taken by a login
+                self._capcha_wakeup.wait(delay)
+                continue
+            try:
+                with self._capcha_lock:
+                    text = None
+                    if self._capcha_refill_delay() == 0:
+                        text = self._solve_capcha()
+                        if text is not None:
+                            self._capcha_buffer = (text, time.monotonic())
+                if text is None:
+                    self._capcha_stop.wait(1)  # low confidence, don't hammer the capcha endpoint
+            except Exception:
+                self._capcha_stop.wait(min(self.capcha_max_age, 5))  # retry later, login fetch capcha itself meanwhile
+
+    def _login_with_new_capcha(self, force: bool = False) -> bool:
+        captcha_text = self._solve_capcha(force)
+        if captcha_text is None:
+            return False  # low confidence, fetch another capcha
+        self.login(captcha_text)
+        return True
+
+    def _login_with_prefetched_capcha(self, force: bool = False) -> bool:
+        if self._capcha_owner == threading.get_ident():
+            # login again from inside the login holding the lock ( e.g. GW200 on the biometric check )
+            return self._login_with_new_capcha(force)
+        self._start_capcha_prefetch()
+        # hold the lock during login, fetching a new capcha may invalidate the one being submitted
+        with self._capcha_lock:
+            self._capcha_owner = threading.get_ident()
+            try:
+                captcha_text = self._take_prefetched_capcha()
+                if captcha_text is None:
+                    return self._login_with_new_capcha(force)
+                self.login(captcha_text)
+                return True
+            finally:
+                self._capcha_owner = None
+                self._capcha_wakeup.set()  # buffer is empty, refill it in background
 
     def _authenticate(self):
         try_count = 0
         while try_count < self.retry_times:
             try_count += 1
-            self._userinfo = None
-            self.sessionId = None
-            img_bytes = self.get_capcha_image()
-            captcha_text = self.ocr_class.process_image(img_bytes)
+            # keep the current session until the new one is set so other callers are not blocked by a refresh
+            # the last try is submitted even when the OCR is not confident
+            force = try_count >= self.retry_times
+            login = self._login_with_prefetched_capcha if self.prefetch_capcha else self._login_with_new_capcha
             try:
-                self.login(captcha_text)
-                return
+                if login(force):
+                    return
             except MBBankAPIError as e:
                 if e.code == "GW283":
                     continue  # capcha error, try again
                 raise e  # other error raise up
         raise CapchaError(f"Exceeded maximum retry times for capcha processing ({self.retry_times})")
 
+    def _iter_history(
+        self,
+        fetch: typing.Callable[[datetime.datetime, datetime.datetime], list[_T]],
+        windows: HistoryWindows,
+        concurrency: int,
+    ) -> typing.Iterator[_T]:
+        seen: set[str] = set()
+        for _, transactions in self._iter_history_windows(fetch, windows, concurrency):
+            yield from self._dedupe_transactions(transactions, seen)
+
+    def _iter_history_windows(
+        self,
+        fetch: typing.Callable[[datetime.datetime, datetime.datetime], list[_T]],
+        windows: HistoryWindows,
+        concurrency: int,
+    ) -> typing.Iterator[tuple[tuple[datetime.date, datetime.date], list[_T]]]:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        def submit(window: tuple[datetime.date, datetime.date]) -> concurrent.futures.Future:
+            start, end = (datetime.datetime.combine(day, datetime.time()) for day in window)
+            return pool.submit(fetch, start, end)
+
+        # windows in planning order with their pending fetch, results are yielded in this order
+        slots: collections.deque[tuple[tuple[datetime.date, datetime.date], concurrent.futures.Future]] = (
+            collections.deque()
+        )
+        pool = concurrent.futures.ThreadPoolExecutor(concurrency, thread_name_prefix="mbbank-history")
+        try:
+            while True:
+                while len(slots) < concurrency:
+                    window = windows.next()
+                    if window is None:
+                        break
+                    slots.append((window, submit(window)))
+                if not slots:
+                    return
+                window, future = slots.popleft()
+                try:
+                    transactions = future.result()
+                except self.transport.TIMEOUT_ERRORS:
+                    halves = windows.split(window)
+                    if halves is None:
+                        raise
+                    slots.extendleft((half, submit(half)) for half in reversed(halves))
+                    continue
+                windows.observe(window, len(transactions))
+                yield window, transactions
+        finally:
+            for _, future in slots:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def _req_reference(self, endpoint: str, path: str, *, json=None) -> dict:
+        # reference data is looked up in cache_dir before any request ( and so before login )
+        disk_cache, ttl = self._disk_cache, self.disk_cache_ttl.get(endpoint)
+        if disk_cache is None or not ttl:
+            return self._req(path, json=json)
+        data_out = disk_cache.load(endpoint, json)
+        if data_out is None:
+            data_out = self._req(path, json=json)
+            disk_cache.save(endpoint, json, data_out, ttl)
+        return data_out
+
+    @_cached
     def getServiceToken(self) -> ServiceTokenResponseModal:
         """
         Get service token for external service usage
@@ -224,10 +579,11 @@ class MBBank(MBBankBase):
             success (ServiceTokenResponseModal): service token
         """
         if self._userinfo is None:
-            self._authenticate()
-        data_out = self._req("https://online.mbbank.com.vn/api/retail_web/common/getServiceToken")
+            self._ensure_authenticated()
+        data_out = self._req("/api/retail_web/common/getServiceToken")
         return ServiceTokenResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getTransactionAccountHistory(
         self,
         *,
@@ -249,19 +605,249 @@ class MBBank(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
+        if self._history_cache is None:
+            return self._fetch_transaction_history(accountNo, from_date, to_date)
+        account_no = self._userid if accountNo is None else accountNo
+        for start, end in self._history_cache.missing(account_no, from_date.date(), to_date.date()):
+            history = self._fetch_transaction_history(
+                account_no,
+                datetime.datetime.combine(start, datetime.time()),
+                datetime.datetime.combine(end, datetime.time()),
+            )
+            self._history_cache.put(account_no, start, end, history)
+        cached = self._history_cache.get(account_no, from_date.date(), to_date.date())
+        if cached is None:  # invalidated meanwhile
+            return self._fetch_transaction_history(account_no, from_date, to_date)
+        return cached
+
+    def _fetch_transaction_history(
+        self, accountNo: typing.Optional[str], from_date: datetime.datetime, to_date: datetime.datetime
+    ) -> TransactionHistoryResponseModal:
         if self._userinfo is None:
-            self._authenticate()
+            self._ensure_authenticated()
         json_data = {
             "accountNo": self._userid if accountNo is None else accountNo,
             "fromDate": from_date.strftime("%d/%m/%Y"),
             "toDate": to_date.strftime("%d/%m/%Y"),  # max 3 months
         }
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail-transactionms/transactionms/get-account-transaction-history",
+            "/api/retail-transactionms/transactionms/get-account-transaction-history",
             json=json_data,
         )
         return TransactionHistoryResponseModal.model_validate(data_out, strict=True)
 
+    def iterTransactionHistory(
+        self,
+        *,
+        accountNo: typing.Optional[str] = None,
+        from_date: datetime.datetime,
+        to_date: datetime.datetime,
+        window: int = 30,
+        concurrency: int = 4,
+    ) -> typing.Iterator[Transaction]:
+        """
+        Iterate account transaction history of any date range, the range is split in windows the server accept
+        which are fetched concurrently, transactions are yielded window by window from `from_date` to `to_date`
+        as soon as a window and the ones before it are fetched.
+
+        Windows get smaller when a response is large ( `HISTORY_SHRINK_AT` ) and a window that timed out is split
+        in two, transactions returned by more than one window are yielded once ( by refNo ).
+
+        Args:
+            accountNo (str, optional): Sub account number Defaults to Main Account number.
+            from_date (datetime.datetime): transaction from date
+            to_date (datetime.datetime): transaction to date
+            window (int, optional): days per request, max `MAX_HISTORY_WINDOW`. Defaults to 30.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+
+        Yields:
+            success (Transaction): transaction
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+
+        def fetch(start: datetime.datetime, end: datetime.datetime) -> list[Transaction]:
+            history = self.getTransactionAccountHistory(accountNo=accountNo, from_date=start, to_date=end)
+            return history.transactionHistoryList
+
+        return self._iter_history(fetch, self._history_windows(from_date, to_date, window), concurrency)
+
+    def syncTransactions(
+        self,
+        store: TransactionStore,
+        *,
+        accountNo: typing.Optional[str] = None,
+        from_date: typing.Optional[datetime.datetime] = None,
+        overlap: datetime.timedelta = datetime.timedelta(days=1),
+        window: int = 30,
+        concurrency: int = 4,
+    ) -> int:
+        """
+        Sync account transactions into a local store, only the days since the last sync ( the store watermark )
+        are fetched again with a small overlap for transactions posted late, then query the store without api calls.
+
+        Args:
+            store (TransactionStore): local store, e.g. SQLiteTransactionStore
+            accountNo (str, optional): Sub account number Defaults to Main Account number.
+            from_date (datetime.datetime, optional): first day to fetch when the account was never synced.
+            Defaults to `MAX_HISTORY_WINDOW` days ago.
+            overlap (datetime.timedelta, optional): time fetched again before the watermark. Defaults to 1 day.
+            window (int, optional): days per request. Defaults to 30.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+
+        Returns:
+            success (int): number of transactions inserted or changed in the store
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+        account_no = self._userid if accountNo is None else accountNo
+        start, end = self._transaction_sync_range(store, store.get_watermark(account_no), from_date, overlap)
+        transactions = list(
+            self.iterTransactionHistory(
+                accountNo=account_no, from_date=start, to_date=end, window=window, concurrency=concurrency
+            )
+        )
+        return store.save_transactions(account_no, transactions, end.date())
+
+    def backfillTransactions(
+        self,
+        store: TransactionStore,
+        *,
+        accountNo: typing.Optional[str] = None,
+        from_date: datetime.datetime,
+        to_date: typing.Optional[datetime.datetime] = None,
+        window: int = 90,
+        concurrency: int = 4,
+        progress: typing.Optional[typing.Callable[[BackfillProgress], typing.Any]] = None,
+    ) -> BackfillProgress:
+        """
+        Backfill account history into a store, walking back from `to_date` to `from_date` window by window
+        with bounded concurrency, each window is saved with a checkpoint so a new call resume where the last one stopped.
+
+        Args:
+            store (TransactionStore): sink saving transactions and checkpoints, e.g. SQLiteTransactionStore
+            accountNo (str, optional): Sub account number Defaults to Main Account number.
+            from_date (datetime.datetime): oldest day to backfill, a day older than the checkpoint one extends the backfill
+            to_date (datetime.datetime, optional): newest day to backfill, ignored when resuming. Defaults to now.
+            window (int, optional): days per request, max `MAX_HISTORY_WINDOW`. Defaults to 90.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+            progress (Callable[[BackfillProgress], Any], optional): called after each saved window. Defaults to None.
+
+        Returns:
+            success (BackfillProgress): final progress, `finished` is True when every day is saved
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+        account_no = self._userid if accountNo is None else accountNo
+        checkpoint, windows = self._backfill_start(
+            store, store.load_backfill_checkpoint(account_no), account_no, from_date, to_date, window
+        )
+        started = time.monotonic()
+        report = self._backfill_progress(checkpoint, 0, 0, started)
+        if windows is None:
+            return report
+
+        def fetch(start: datetime.datetime, end: datetime.datetime) -> list[Transaction]:
+            return self._fetch_transaction_history(account_no, start, end).transactionHistoryList
+
+        # windows come back newest first, so the oldest saved day only moves back over fully saved days
+        for (start, _), transactions in self._iter_history_windows(fetch, windows, concurrency):
+            checkpoint = checkpoint.model_copy(
+                update={
+                    "done_until": start,
+                    "transactions": checkpoint.transactions + len(transactions),
+                    "timestamp": time.time(),
+                }
+            )
+            store.save_backfill_window(account_no, transactions, checkpoint)
+            report = self._backfill_progress(
+                checkpoint, report.windows + 1, report.transactions + len(transactions), started
+            )
+            if progress is not None:
+                progress(report)
+        return report
+
+    def watchTransactions(
+        self,
+        callback: typing.Callable[[Transaction], typing.Any],
+        *,
+        accountNo: str | list[str] | None = None,
+        balance_gated: bool = False,
+        min_interval: float = 5,
+        max_interval: float = 60,
+        seen_size: int = 10000,
+        skip_existing: bool = True,
+        max_errors: int = 10,
+        stop_event: typing.Optional[threading.Event] = None,
+    ):
+        """
+        Watch new account transactions ( e.g. incoming payments ) and call `callback` with each of them,
+        block until `stop_event` is set
+
+        Poll the shortest window ( today, and yesterday right after midnight ), the poll interval goes back to
+        `min_interval` when a new transaction arrives, grows toward `max_interval` while idle and backs off on errors.
+        Expired sessions are renewed like any other call, other errors are retried until `max_errors` in a row.
+
+        With `balance_gated` each tick only calls `getBalance` and fetches the history of the accounts whose
+        balance changed, without `accountNo` it watches the username account if `getBalance` lists it or else
+        the default account of the user, accounts not listed by `getBalance` are always fetched.
+
+        Args:
+            callback (Callable[[Transaction], Any]): called with each new transaction, oldest first
+            accountNo (str or list[str], optional): account numbers to watch. Defaults to Main Account number.
+            balance_gated (bool, optional): poll balances and fetch history only for accounts that changed. Defaults to False.
+            min_interval (float, optional): shortest seconds between polls. Defaults to 5.
+            max_interval (float, optional): longest seconds between polls. Defaults to 60.
+            seen_size (int, optional): number of recent refNo remembered to skip already reported transactions. Defaults to 10000.
+            skip_existing (bool, optional): don't report transactions already there at the first poll. Defaults to True.
+            max_errors (int, optional): consecutive failed polls before the error is raised. Defaults to 10.
+            stop_event (threading.Event, optional): set it to stop watching. Defaults to None ( watch forever ).
+
+        Raises:
+            MBBankAPIError: if api response not ok `max_errors` times in a row
+        """
+        stop_event = threading.Event() if stop_event is None else stop_event
+        accounts = self._watch_accounts(accountNo)
+        poll = AdaptivePollInterval(min_interval, max_interval)
+        seen = SeenSet(seen_size)
+        gate = BalanceGate() if balance_gated else None
+        last_days: dict[str, datetime.date] = {}
+        while not stop_event.is_set():
+            try:
+                due = accounts
+                if gate is not None:
+                    balance = self._fetch_balance()
+                    if accountNo is None:
+                        accounts = [self._watch_default_account(balance)]
+                    due = gate.due(accounts, {account.acctNo: account.currentBalance for account in balance.acct_list})
+                # watch the latest transactions, bypassing response and history caches
+                histories = []
+                for account in due:
+                    from_date, to_date = self._watch_window(last_days.get(account))
+                    history = self._fetch_transaction_history(account, from_date, to_date)
+                    histories.append((account, to_date, history.transactionHistoryList))
+            except Exception:
+                delay = poll.on_error()
+                if poll.errors >= max_errors:
+                    raise
+                stop_event.wait(delay)
+                continue
+            new = self._watch_collect(histories, seen, last_days, skip_existing, gate)
+            for transaction in new:
+                callback(transaction)
+            stop_event.wait(poll.on_result(len(new)))
+
+    def _fetch_balance(self) -> BalanceResponseModal:
+        # not cached, _req also calls it to check the session
+        if self._userinfo is None:
+            self._ensure_authenticated()
+        data_out = self._req("/api/retail-accountms/accountms/getBalance")
+        return BalanceResponseModal.model_validate(data_out, strict=True)
+
+    @_cached
     def getBalance(self) -> BalanceResponseModal:
         """
         Get all main account and subaccount balance
@@ -272,11 +858,9 @@ class MBBank(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        if self._userinfo is None:
-            self._authenticate()
-        data_out = self._req("https://online.mbbank.com.vn/api/retail-accountms/accountms/getBalance")
-        return BalanceResponseModal.model_validate(data_out, strict=True)
+        return self._fetch_balance()
 
+    @_cached
     def getBalanceLoyalty(self) -> BalanceLoyaltyResponseModal:
         """
         Get Account loyalty rank and Member loyalty point
@@ -287,9 +871,10 @@ class MBBank(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = self._req("https://online.mbbank.com.vn/api/retail_web/loyalty/getBalanceLoyalty")
+        data_out = self._req("/api/retail_web/loyalty/getBalanceLoyalty")
         return BalanceLoyaltyResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getInterestRate(self, currency: str = "VND") -> InterestRateResponseModal:
         """
         Get saving interest rate
@@ -307,12 +892,14 @@ class MBBank(MBBankBase):
             "productCode": "TIENGUI.KHN.EMB",
             "currency": currency,
         }
-        data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/saving/getInterestRate",
+        data_out = self._req_reference(
+            "getInterestRate",
+            "/api/retail_web/saving/getInterestRate",
             json=json_data,
         )
         return InterestRateResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getFavorBeneficiaryList(
         self,
         *,
@@ -334,11 +921,12 @@ class MBBank(MBBankBase):
         """
         json_data = {"transactionType": transactionType, "searchType": searchType}
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/internetbanking/getFavorBeneficiaryList",
+            "/api/retail_web/internetbanking/getFavorBeneficiaryList",
             json=json_data,
         )
         return BeneficiaryListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getCardList(self) -> CardListResponseModal:
         """
         Get all card list from your account
@@ -349,9 +937,10 @@ class MBBank(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = self._req("https://online.mbbank.com.vn/api/retail_web/card/getList")
+        data_out = self._req("/api/retail_web/card/getList")
         return CardListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getSavingList(self) -> SavingListResponseModal:
         """
         Get all saving list from your account
@@ -362,9 +951,10 @@ class MBBank(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = self._req("https://online.mbbank.com.vn/api/retail-savingms/saving/v3.0/getList")
+        data_out = self._req("/api/retail-savingms/saving/v3.0/getList")
         return SavingListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getSavingDetail(self, accNo: str, accType: typing.Literal["OSA", "SBA"]) -> SavingDetailResponseModal:
         """
         Get saving detail by account number
@@ -381,11 +971,12 @@ class MBBank(MBBankBase):
         """
         json_data = {"accNo": accNo, "accType": accType}
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/saving/getDetail",
+            "/api/retail_web/saving/getDetail",
             json=json_data,
         )
         return SavingDetailResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getLoanList(self) -> LoanListResponseModal:
         """
         Get all loan list from your account
@@ -396,9 +987,10 @@ class MBBank(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        data_out = self._req("https://online.mbbank.com.vn/api/retail-onlineloanms/loan/getList")
+        data_out = self._req("/api/retail-onlineloanms/loan/getList")
         return LoanListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getCardTransactionHistory(
         self, cardNo: str, from_date: datetime.datetime, to_date: datetime.datetime
     ) -> CardTransactionsResponseModal:
@@ -425,11 +1017,43 @@ class MBBank(MBBankBase):
             "type": "CARD",
         }
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/common/getTransactionHistory",
+            "/api/retail_web/common/getTransactionHistory",
             json=json_data,
         )
         return CardTransactionsResponseModal.model_validate(data_out, strict=True)
 
+    def iterCardTransactionHistory(
+        self,
+        cardNo: str,
+        from_date: datetime.datetime,
+        to_date: datetime.datetime,
+        *,
+        window: int = 30,
+        concurrency: int = 4,
+    ) -> typing.Iterator[CardTransaction]:
+        """
+        Iterate card transaction history of any date range, see `iterTransactionHistory` for how the range is fetched
+
+        Args:
+            cardNo (str): card number get from getCardList
+            from_date (datetime.datetime): from date
+            to_date (datetime.datetime): to date
+            window (int, optional): days per request, max `MAX_HISTORY_WINDOW`. Defaults to 30.
+            concurrency (int, optional): maximum number of requests at the same time. Defaults to 4.
+
+        Yields:
+            success (CardTransaction): card transaction
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+
+        def fetch(start: datetime.datetime, end: datetime.datetime) -> list[CardTransaction]:
+            return self.getCardTransactionHistory(cardNo, start, end).transactionHistoryList
+
+        return self._iter_history(fetch, self._history_windows(from_date, to_date, window), concurrency)
+
+    @_cached
     def getBankList(self) -> BankListResponseModal:
         """
         Get transfer all bank list
@@ -440,14 +1064,28 @@ class MBBank(MBBankBase):
         Raises:
             MBBankAPIError: if api response not ok
         """
-        if "bank_list" in self._temp:
-            return BankListResponseModal.model_validate(
-                self._temp["bank_list"], strict=True
-            )  # use cache seen as bank list not change often
-        data_out = self._req("https://online.mbbank.com.vn/api/retail_web/common/getBankList")
-        self._temp["bank_list"] = data_out
-        return BankListResponseModal.model_validate(data_out, strict=True)
+        data_out = self._req_reference("getBankList", "/api/retail_web/common/getBankList")
+        bank_list = BankListResponseModal.model_validate(data_out, strict=True)
+        self._update_bank_directory(bank_list)
+        return bank_list
 
+    def getBankDirectory(self) -> BankDirectory:
+        """
+        Get bank list indexed for fast lookup by bank code, sml code, citad code and card number,
+        indexes are built once and reused until `getBankList` returns different banks
+        or `invalidate_cache("getBankList")` is called
+
+        Returns:
+            success (BankDirectory): indexed bank list
+
+        Raises:
+            MBBankAPIError: if api response not ok
+        """
+        if self._bank_directory is not None:
+            return self._bank_directory
+        return self._get_bank_directory(self.getBankList())
+
+    @_cached
     def getAccountByPhone(self, phone: str) -> AccountByPhoneResponseModal:
         """
         Get transfer account info by phone (MBank internal account only)
@@ -463,11 +1101,12 @@ class MBBank(MBBankBase):
         """
         json_data = {"phone": phone}
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/common/getAccountByPhone",
+            "/api/retail_web/common/getAccountByPhone",
             json=json_data,
         )
         return AccountByPhoneResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getSavedBeneficiary(self) -> SavedBeneficiaryListResponseModal:
         """
         Get all saved beneficiary list from your account.
@@ -479,11 +1118,12 @@ class MBBank(MBBankBase):
         """
         json_data = {"type": "TRANSFER"}
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/common/getBeneficiary",
+            "/api/retail_web/common/getBeneficiary",
             json=json_data,
         )
         return SavedBeneficiaryListResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getAccountName(self, accountNo: str, bankCode: str, debitAccount: str) -> AccountNameResponseModal:
         """
         Get account name by account number
@@ -507,7 +1147,7 @@ class MBBank(MBBankBase):
             "remark": "",
         }
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/v1.0/inquiry-account-name",
+            "/api/retail_web/transfer/v1.0/inquiry-account-name",
             json=json_data,
         )
         return AccountNameResponseModal.model_validate(data_out, strict=True)
@@ -532,14 +1172,13 @@ class MBBank(MBBankBase):
             "cardNumber": cardNumber,
             "requestID": f"{self._userid}-{self._get_now_time()}",
         }
-        with requests.post(
-            "https://mbcard.mbbank.com.vn:8446/mbcardgw/internet/cardinfo/v1_0/generateid",
+        r = self.transport.post(
+            "/mbcardgw/internet/cardinfo/v1_0/generateid",
             headers=headers,
             json=json_data,
-            proxies=self.proxy,
-            timeout=self.timeout,
-        ) as r:
-            data_out = r.json()
+            host="card",
+        )
+        data_out = r.json()
         return ATMCardIDResponseModal.model_validate(data_out, strict=True)
 
     def getATMAccountName(self, cardNumber: str, debitAccount: str) -> ATMAccountNameResponseModal:
@@ -564,12 +1203,7 @@ class MBBank(MBBankBase):
                     "message": card_id.errorInfo.message,
                 }
             )
-        bank_list = self.getBankList()
-        bank_info: typing.Optional[Bank] = None
-        for bank in bank_list.listBank:
-            if cardNumber.startswith(bank.smlCode):
-                bank_info = bank
-                break
+        bank_info = self.getBankDirectory().by_card_number(cardNumber)
         if bank_info is None:
             raise BankNotFoundError("ATM Card Bank not found in bank list")
         json_data = {
@@ -582,7 +1216,7 @@ class MBBank(MBBankBase):
             "remark": "",
         }
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/inquiryAccountName",
+            "/api/retail_web/transfer/inquiryAccountName",
             json=json_data,
         )
         return ATMAccountNameResponseModal.model_validate(data_out, strict=True)
@@ -645,14 +1279,16 @@ class MBBank(MBBankBase):
         )
         return context.start()
 
+    @_cached
     def getBulkPaymentStatus(self) -> BulkPaymentStatusResponseModal:
-        data_out = self._req("https://online.mbbank.com.vn/api/retail-bulkpaymentms/getBulkPaymentStatus")
+        data_out = self._req("/api/retail-bulkpaymentms/getBulkPaymentStatus")
         return BulkPaymentStatusResponseModal.model_validate(data_out, strict=True)
 
+    @_cached
     def getBulkPaymentDetail(self, bulk_id: str) -> BulkPaymentDetailResponseModal:
         json_data = {"bulkId": bulk_id}
         data_out = self._req(
-            "https://online.mbbank.com.vn/api/retail-bulkpaymentms/getBulkPaymentDetail",
+            "/api/retail-bulkpaymentms/getBulkPaymentDetail",
             json=json_data,
         )
         return BulkPaymentDetailResponseModal.model_validate(data_out, strict=True)
@@ -668,5 +1304,5 @@ class MBBank(MBBankBase):
             MBBankAPIError: if api response not ok
         """
         if self._userinfo is None:
-            self._authenticate()
+            self._ensure_authenticated()
         return UserInfoResponseModal.model_validate(self._userinfo, strict=True)
@@ -78,11 +78,10 @@ class TransferContext(TransferContextBase):
         """
         if self.bank is not None:
             return self.bank
-        bank_list = self.mbbank.getBankList()
-        for bank in bank_list.listBank:
-            if bank.bankCode == self.bank_code:
-                self.bank = bank
-                return bank
+        bank = self.mbbank.getBankDirectory().by_bank_code(self.bank_code)
+        if bank is not None:
+            self.bank = bank
+            return bank
         raise BankNotFoundError("Bank code not found in bank list")
 
     def verify_transfer(self) -> TransferResponseModal:
@@ -112,7 +111,7 @@ class TransferContext(TransferContextBase):
             "otp": "",
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/v1.0/verify-make-transfer",
+            "/api/retail_web/transfer/v1.0/verify-make-transfer",
             json=json_data,
             encrypt=True,
         )
@@ -137,7 +136,7 @@ class TransferContext(TransferContextBase):
             "serviceCode": f"GCM_FTR_DOM_{self.bank.typeTransfer}",
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/internetbanking/getAuthList",
+            "/api/retail_web/internetbanking/getAuthList",
             json=json_data,
             encrypt=True,
         )
@@ -171,7 +170,7 @@ class TransferContext(TransferContextBase):
             }
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/vtap/createTransactionAuthen",
+            "/api/retail_web/vtap/createTransactionAuthen",
             json=json_data,
             encrypt=True,
         )
@@ -209,7 +208,7 @@ class TransferContext(TransferContextBase):
             "otp": otp_crafted,
         }
         data_out = self.mbbank._req(
-            "https://online.mbbank.com.vn/api/retail_web/transfer/v1.0/make-transfer",
+            "/api/retail_web/transfer/v1.0/make-transfer",
             json=json_data,
             encrypt=True,
         )
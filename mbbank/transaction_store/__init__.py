@@ -0,0 +1,4 @@
+from .base import BackfillCheckpoint, TransactionStore, parse_transaction_time
+from .sqlite_store import SQLiteTransactionStore
+
+__all__ = ["BackfillCheckpoint", "SQLiteTransactionStore", "TransactionStore", "parse_transaction_time"]
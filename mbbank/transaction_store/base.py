@@ -0,0 +1,234 @@
+import asyncio
+import datetime
+import time
+import typing
+
+from pydantic import BaseModel, Field
+
+from mbbank.modals import Transaction
+
+
+def parse_transaction_time(value: str) -> typing.Optional[datetime.datetime]:
+    """
+    Parse date time of a transaction returned by the server ( e.g. "31/12/2024 23:59:59" )
+
+    Args:
+        value (str): transactionDate or postingDate of a transaction
+
+    Returns:
+        success (datetime.datetime or None): parsed date time or None if the format is unknown
+    """
+    for fmt in ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y"):
+        try:
+            return datetime.datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+class BackfillCheckpoint(BaseModel):
+    """
+    Progress of a history backfill saved with each completed window so the backfill can resume
+
+    Attributes:
+        account_no (str): account number
+        from_date (datetime.date): oldest day to backfill
+        to_date (datetime.date): newest day to backfill, the backfill walks from it back to `from_date`
+        done_until (datetime.date or None): every day from it to `to_date` is saved, None if nothing saved yet
+        transactions (int): number of transactions saved so far
+        timestamp (float): unix time of the last update
+    """
+
+    account_no: str
+    from_date: datetime.date
+    to_date: datetime.date
+    done_until: typing.Optional[datetime.date] = None
+    transactions: int = 0
+    timestamp: float = Field(default_factory=time.time)
+
+
+class TransactionStore:
+    """
+    Base class for local transaction store for self-implemented, filled by `syncTransactions`
+
+    Transactions are identified by account number, refNo and postingDate so syncing the same window again
+    update rows instead of adding duplicates, each account keep a watermark of the last synced day.
+
+    Examples:
+    ```py
+    class MyTransactionStore(TransactionStore):
+        def get_watermark(self, account_no: str) -> Optional[datetime.date]:
+            # return last synced day or None
+            return None
+
+        def save_transactions(self, account_no: str, transactions: list[Transaction], watermark: datetime.date) -> int:
+            # upsert transactions and watermark at once, return number of rows written
+            return 0
+
+        def query(self, account_no: str, *, from_date=None, to_date=None, limit=None) -> list[Transaction]:
+            # return saved transactions ordered by transaction date
+            return []
+    ```
+
+    Stores used with `backfillTransactions` also implement `load_backfill_checkpoint` and `save_backfill_window`.
+
+    Note: async methods run the sync ones in a thread by default, override them for a native async implementation.
+    """
+
+    def get_watermark(self, account_no: str) -> typing.Optional[datetime.date]:
+        """
+        Get last day synced for an account
+
+        Args:
+            account_no (str): account number
+
+        Returns:
+            success (datetime.date or None): last synced day or None if never synced
+        """
+        raise NotImplementedError("get_watermark is not implemented")
+
+    def save_transactions(self, account_no: str, transactions: list[Transaction], watermark: datetime.date) -> int:
+        """
+        Upsert transactions by refNo and postingDate and move the account watermark in one transaction
+
+        Args:
+            account_no (str): account number
+            transactions (list[Transaction]): transactions fetched up to watermark
+            watermark (datetime.date): last day fetched
+
+        Returns:
+            success (int): number of transactions inserted or changed
+        """
+        raise NotImplementedError("save_transactions is not implemented")
+
+    def query(
+        self,
+        account_no: str,
+        *,
+        from_date: typing.Optional[datetime.datetime] = None,
+        to_date: typing.Optional[datetime.datetime] = None,
+        limit: typing.Optional[int] = None,
+    ) -> list[Transaction]:
+        """
+        Get saved transactions of an account without any api call
+
+        Args:
+            account_no (str): account number
+            from_date (datetime.datetime, optional): first transaction date included. Defaults to None.
+            to_date (datetime.datetime, optional): last transaction date included. Defaults to None.
+            limit (int, optional): only return the latest `limit` transactions. Defaults to None.
+
+        Returns:
+            success (list[Transaction]): transactions ordered by transaction date
+        """
+        raise NotImplementedError("query is not implemented")
+
+    def load_backfill_checkpoint(self, account_no: str) -> typing.Optional[BackfillCheckpoint]:
+        """
+        Load backfill checkpoint of an account
+
+        Args:
+            account_no (str): account number
+
+        Returns:
+            success (BackfillCheckpoint or None): saved checkpoint or None if never backfilled
+        """
+        raise NotImplementedError("load_backfill_checkpoint is not implemented")
+
+    def save_backfill_window(
+        self, account_no: str, transactions: list[Transaction], checkpoint: BackfillCheckpoint
+    ) -> int:
+        """
+        Upsert transactions of a backfilled window and save the checkpoint in one transaction,
+        so a crash never leaves a checkpoint ahead of the saved transactions
+
+        Args:
+            account_no (str): account number
+            transactions (list[Transaction]): transactions of the window
+            checkpoint (BackfillCheckpoint): checkpoint including the window
+
+        Returns:
+            success (int): number of transactions inserted or changed
+        """
+        raise NotImplementedError("save_backfill_window is not implemented")
+
+    async def get_watermark_async(self, account_no: str) -> typing.Optional[datetime.date]:
+        """
+        Async get last day synced for an account
+
+        Args:
+            account_no (str): account number
+
+        Returns:
+            success (datetime.date or None): last synced day or None if never synced
+        """
+        return await asyncio.to_thread(self.get_watermark, account_no)
+
+    async def save_transactions_async(
+        self, account_no: str, transactions: list[Transaction], watermark: datetime.date
+    ) -> int:
+        """
+        Async upsert transactions and move the account watermark
+
+        Args:
+            account_no (str): account number
+            transactions (list[Transaction]): transactions fetched up to watermark
+            watermark (datetime.date): last day fetched
+
+        Returns:
+            success (int): number of transactions inserted or changed
+        """
+        return await asyncio.to_thread(self.save_transactions, account_no, transactions, watermark)
+
+    async def query_async(
+        self,
+        account_no: str,
+        *,
+        from_date: typing.Optional[datetime.datetime] = None,
+        to_date: typing.Optional[datetime.datetime] = None,
+        limit: typing.Optional[int] = None,
+    ) -> list[Transaction]:
+        """
+        Async get saved transactions of an account
+
+        Args:
+            account_no (str): account number
+            from_date (datetime.datetime, optional): first transaction date included. Defaults to None.
+            to_date (datetime.datetime, optional): last transaction date included. Defaults to None.
+            limit (int, optional): only return the latest `limit` transactions. Defaults to None.
+
+        Returns:
+            success (list[Transaction]): transactions ordered by transaction date
+        """
+        return await asyncio.to_thread(self.query, account_no, from_date=from_date, to_date=to_date, limit=limit)
+
+    async def load_backfill_checkpoint_async(self, account_no: str) -> typing.Optional[BackfillCheckpoint]:
+        """
+        Async load backfill checkpoint of an account
+
+        Args:
+            account_no (str): account number
+
+        Returns:
+            success (BackfillCheckpoint or None): saved checkpoint or None if never backfilled
+        """
+        return await asyncio.to_thread(self.load_backfill_checkpoint, account_no)
+
+    async def save_backfill_window_async(
+        self, account_no: str, transactions: list[Transaction], checkpoint: BackfillCheckpoint
+    ) -> int:
+        """
+        Async upsert transactions of a backfilled window and save the checkpoint
+
+        Args:
+            account_no (str): account number
+            transactions (list[Transaction]): transactions of the window
+            checkpoint (BackfillCheckpoint): checkpoint including the window
+
+        Returns:
+            success (int): number of transactions inserted or changed
+        """
+        return await asyncio.to_thread(self.save_backfill_window, account_no, transactions, checkpoint)
+
+
+__all__ = ["BackfillCheckpoint", "TransactionStore", "parse_transaction_time"]
@@ -0,0 +1,141 @@
+import contextlib
+import datetime
+import os
+import sqlite3
+import typing
+
+import pydantic
+
+from mbbank.modals import Transaction
+
+from .base import BackfillCheckpoint, TransactionStore, parse_transaction_time
+
+
+class SQLiteTransactionStore(TransactionStore):
+    """
+    Transaction store backed by a SQLite database file, transactions are saved as json with indexed columns
+    for account and transaction date so reporting queries are served locally.
+
+    Args:
+        path (str or os.PathLike): database file path, created if not exists
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = os.fspath(path)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transactions ("
+                "account_no TEXT NOT NULL, ref_no TEXT NOT NULL, posting_date TEXT NOT NULL, "
+                "transaction_time TEXT, data TEXT NOT NULL, "
+                "PRIMARY KEY (account_no, ref_no, posting_date))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS transactions_time ON transactions (account_no, transaction_time)")
+            conn.execute("CREATE TABLE IF NOT EXISTS watermarks (account_no TEXT PRIMARY KEY, synced_to TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS backfills (account_no TEXT PRIMARY KEY, state TEXT NOT NULL)")
+
+    @contextlib.contextmanager
+    def _connect(self) -> typing.Iterator[sqlite3.Connection]:
+        # autocommit mode, transactions are opened explicitly where needed
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_watermark(self, account_no: str) -> typing.Optional[datetime.date]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT synced_to FROM watermarks WHERE account_no = ?", (account_no,)).fetchone()
+        return None if row is None else datetime.date.fromisoformat(row[0])
+
+    def _upsert(self, conn: sqlite3.Connection, account_no: str, transactions: list[Transaction]) -> int:
+        rows = []
+        for transaction in transactions:
+            time = parse_transaction_time(transaction.transactionDate)
+            rows.append(
+                (
+                    account_no,
+                    transaction.refNo,
+                    transaction.postingDate,
+                    None if time is None else time.isoformat(sep=" "),
+                    transaction.model_dump_json(),
+                )
+            )
+        before = conn.total_changes
+        # rows that didn't change are skipped so the count only covers new or updated transactions
+        conn.executemany(
+            "INSERT INTO transactions (account_no, ref_no, posting_date, transaction_time, data) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (account_no, ref_no, posting_date) DO UPDATE SET "
+            "transaction_time = excluded.transaction_time, data = excluded.data "
+            "WHERE data != excluded.data",
+            rows,
+        )
+        return conn.total_changes - before
+
+    def save_transactions(self, account_no: str, transactions: list[Transaction], watermark: datetime.date) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                written = self._upsert(conn, account_no, transactions)
+                conn.execute(
+                    "INSERT OR REPLACE INTO watermarks (account_no, synced_to) VALUES (?, ?)",
+                    (account_no, watermark.isoformat()),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def load_backfill_checkpoint(self, account_no: str) -> typing.Optional[BackfillCheckpoint]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT state FROM backfills WHERE account_no = ?", (account_no,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return BackfillCheckpoint.model_validate_json(row[0])
+        except pydantic.ValidationError:
+            return None
+
+    def save_backfill_window(
+        self, account_no: str, transactions: list[Transaction], checkpoint: BackfillCheckpoint
+    ) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                written = self._upsert(conn, account_no, transactions)
+                conn.execute(
+                    "INSERT OR REPLACE INTO backfills (account_no, state) VALUES (?, ?)",
+                    (account_no, checkpoint.model_dump_json()),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def query(
+        self,
+        account_no: str,
+        *,
+        from_date: typing.Optional[datetime.datetime] = None,
+        to_date: typing.Optional[datetime.datetime] = None,
+        limit: typing.Optional[int] = None,
+    ) -> list[Transaction]:
+        sql = "SELECT data FROM transactions WHERE account_no = ?"
+        params: list[typing.Any] = [account_no]
+        if from_date is not None:
+            sql += " AND transaction_time >= ?"
+            params.append(from_date.isoformat(sep=" "))
+        if to_date is not None:
+            sql += " AND transaction_time <= ?"
+            params.append(to_date.isoformat(sep=" "))
+        sql += " ORDER BY transaction_time DESC, rowid DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [Transaction.model_validate_json(row[0]) for row in reversed(rows)]
+
+
+__all__ = ["SQLiteTransactionStore"]
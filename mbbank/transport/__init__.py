@@ -0,0 +1,13 @@
+from .aiohttp_transport import AiohttpTransport
+from .base import Transport, TransportResponse
+from .memory_transport import MemoryTransport, TransportRequest
+from .requests_transport import RequestsTransport
+
+__all__ = [
+    "AiohttpTransport",
+    "MemoryTransport",
+    "RequestsTransport",
+    "Transport",
+    "TransportRequest",
+    "TransportResponse",
+]
@@ -0,0 +1,101 @@
+import asyncio
+import contextlib
+import typing
+
+import aiohttp
+
+from .base import Transport, TransportResponse
+
+
+class AiohttpTransport(Transport):
+    """
+    Transport using one pooled `aiohttp.ClientSession` per host and event loop, default transport of `MBBankAsync`
+
+    Sessions are bound to the event loop they are created in, so a client reused by another `asyncio.run`
+    gets new sessions and the ones of closed event loops are dropped.
+
+    Args:
+        proxy (str, optional): Proxy url. Example: "http://127.0.0.1:8080". Defaults to None.
+        timeout (Union[float, Tuple[float, float]], optional): request timeout in seconds or
+        (connect timeout, read timeout) or None for no timeout. Defaults to None.
+        connector_limit (int, optional): maximum number of open connections per host session. Defaults to 100.
+        connector_limit_per_host (int, optional): maximum number of open connections to the same endpoint, 0 for no limit. Defaults to 0.
+        keepalive_timeout (float, optional): seconds an idle connection is kept in the pool for reuse. Defaults to 30.
+        base_urls (dict[str, str], optional): override base url per host name. Defaults to `Transport.BASE_URLS`.
+    """
+
+    def __init__(
+        self,
+        *,
+        proxy: typing.Optional[str] = None,
+        timeout: float | tuple[float, float] | None = None,
+        connector_limit: int = 100,
+        connector_limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        base_urls: typing.Optional[dict[str, str]] = None,
+    ):
+        super().__init__(base_urls=base_urls)
+        self.proxy = proxy
+        self.timeout: typing.Optional[aiohttp.ClientTimeout] = None
+        if isinstance(timeout, tuple) and len(timeout) == 2:
+            self.timeout = aiohttp.ClientTimeout(connect=timeout[0], sock_read=timeout[1])
+        elif isinstance(timeout, (int, float)):
+            self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.connector_limit = connector_limit
+        self.connector_limit_per_host = connector_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions: dict[tuple[asyncio.AbstractEventLoop, str], aiohttp.ClientSession] = {}
+
+    @staticmethod
+    def _discard_session(session: aiohttp.ClientSession):
+        # the event loop of the session is closed so it can't be awaited anymore, drop its connections now
+        connector = session.connector
+        session.detach()
+        if connector is not None:
+            with contextlib.suppress(Exception):
+                connector._close()
+
+    def _discard_dead_sessions(self):
+        for key, session in list(self._sessions.items()):
+            if key[0].is_closed() and self._sessions.pop(key, None) is session:
+                self._discard_session(session)
+
+    def _get_session(self, host: str) -> aiohttp.ClientSession:
+        # one long-lived pooled session per host and event loop so connections are reused between calls
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get((loop, host))
+        if session is None or session.closed:
+            self._discard_dead_sessions()
+            connector = aiohttp.TCPConnector(
+                limit=self.connector_limit,
+                limit_per_host=self.connector_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._sessions[(loop, host)] = session
+        return session
+
+    async def post_async(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+        async with self._get_session(host).post(
+            self.url(path, host),
+            headers=headers,
+            json=json,
+            proxy=self.proxy,
+        ) as r:
+            return TransportResponse(r.status, await r.read(), r.content_type)
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        sessions = list(self._sessions.items())
+        self._sessions.clear()
+        for (session_loop, _), session in sessions:
+            if session_loop is loop:
+                await session.close()
+            elif session_loop.is_closed():
+                self._discard_session(session)
+            else:
+                # session used by an event loop running in another thread
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), session_loop))
+
+
+__all__ = ["AiohttpTransport"]
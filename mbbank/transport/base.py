@@ -0,0 +1,133 @@
+import asyncio
+import json
+import typing
+
+
+class TransportResponse:
+    """
+    Raw http response returned by a transport
+
+    Attributes:
+        status (int): http status code
+        content_type (str): response content type
+        content (bytes): raw response body
+    """
+
+    status: int
+    content_type: str
+    content: bytes
+
+    def __init__(self, status: int, content: bytes, content_type: str = "application/json"):
+        self.status = status
+        self.content = content
+        self.content_type = content_type
+
+    @property
+    def text(self) -> str:
+        """Response body decoded as utf-8 text"""
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> typing.Any:
+        """
+        Decode response body as json
+
+        Returns:
+            success (Any): decoded json data
+        """
+        return json.loads(self.content)
+
+
+class Transport:
+    """
+    Base class for http transport for self-implemented, both `MBBank` and `MBBankAsync` send every request through it
+
+    Requests are addressed by host name and path, the host name is resolved with `base_urls`
+    so the same client can be pointed to another server (or a mock) without changing any endpoint.
+
+    Examples:
+    ```py
+    class MyTransport(Transport):
+        def post(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+            # send request for sync implementation
+            return TransportResponse(200, b'{"result": {"ok": true}}')
+
+        async def post_async(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+            # send request for async implementation
+            return TransportResponse(200, b'{"result": {"ok": true}}')
+    ```
+
+    Args:
+        base_urls (dict[str, str], optional): override base url per host name, known host names are
+        "online" (internet banking api) and "card" (card gateway). Defaults to `BASE_URLS`.
+    """
+
+    BASE_URLS: typing.ClassVar[dict[str, str]] = {
+        "online": "https://online.mbbank.com.vn",
+        "card": "https://mbcard.mbbank.com.vn:8446",
+    }
+
+    # exceptions raised by this transport when a request timed out
+    TIMEOUT_ERRORS: typing.ClassVar[tuple[type[BaseException], ...]] = (TimeoutError, asyncio.TimeoutError)
+
+    def __init__(self, *, base_urls: typing.Optional[dict[str, str]] = None):
+        self.base_urls: dict[str, str] = self.BASE_URLS.copy()
+        if base_urls is not None:
+            self.base_urls.update(base_urls)
+
+    def url(self, path: str, host: str = "online") -> str:
+        """
+        Build full url from host name and path
+
+        Args:
+            path (str): request path start with "/", full url is returned as is
+            host (str, optional): host name in `base_urls`. Defaults to "online".
+
+        Returns:
+            success (str): full request url
+        """
+        if path.startswith(("http://", "https://")):
+            return path
+        return self.base_urls[host].rstrip("/") + path
+
+    def post(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+        """
+        Send post request for sync implementation
+
+        Args:
+            path (str): request path
+            headers (dict): request headers
+            json (dict): json body
+            host (str, optional): host name in `base_urls`. Defaults to "online".
+
+        Returns:
+            success (TransportResponse): http response
+        """
+        raise NotImplementedError("post is not implemented")
+
+    async def post_async(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+        """
+        Send post request for async implementation
+
+        Args:
+            path (str): request path
+            headers (dict): request headers
+            json (dict): json body
+            host (str, optional): host name in `base_urls`. Defaults to "online".
+
+        Returns:
+            success (TransportResponse): http response
+        """
+        raise NotImplementedError("post_async is not implemented")
+
+    def close(self):
+        """
+        Release resources held by sync implementation if needed
+        """
+
+    async def aclose(self):
+        """
+        Release resources held by async implementation if needed
+        """
+
+
+__all__ = ["Transport", "TransportResponse"]
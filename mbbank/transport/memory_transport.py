@@ -0,0 +1,91 @@
+import json as jsonlib
+import typing
+
+from .base import Transport, TransportResponse
+
+
+class TransportRequest:
+    """
+    Request recorded by `MemoryTransport`
+
+    Attributes:
+        host (str): host name
+        path (str): request path
+        headers (dict): request headers
+        json (dict): json body
+    """
+
+    host: str
+    path: str
+    headers: dict
+    json: dict
+
+    def __init__(self, *, host: str, path: str, headers: dict, json: dict):
+        self.host = host
+        self.path = path
+        self.headers = headers
+        self.json = json
+
+
+RouteHandler = dict | TransportResponse | typing.Callable[[TransportRequest], dict | TransportResponse]
+
+
+class MemoryTransport(Transport):
+    """
+    In-memory transport that answers from registered routes without any network access,
+    useful for tests and for benchmarking client overhead.
+
+    Examples:
+    ```py
+    transport = MemoryTransport()
+    transport.add_route("/api/retail-accountms/accountms/getBalance", {"result": {"ok": True}, ...})
+    mb = MBBank(username="user", password="pass", transport=transport)
+    ```
+
+    Args:
+        routes (dict[str, RouteHandler], optional): initial routes keyed by path. a route value can be a json dict,
+        a `TransportResponse` or a callable taking `TransportRequest` and returning one of those.
+        base_urls (dict[str, str], optional): override base url per host name. Defaults to `Transport.BASE_URLS`.
+
+    Attributes:
+        requests (list[TransportRequest]): every request sent through this transport
+    """
+
+    def __init__(
+        self,
+        routes: typing.Optional[dict[str, RouteHandler]] = None,
+        *,
+        base_urls: typing.Optional[dict[str, str]] = None,
+    ):
+        super().__init__(base_urls=base_urls)
+        self.routes: dict[str, RouteHandler] = dict(routes or {})
+        self.requests: list[TransportRequest] = []
+
+    def add_route(self, path: str, handler: RouteHandler):
+        """
+        Register response for a path
+
+        Args:
+            path (str): request path
+            handler (RouteHandler): json dict, `TransportResponse` or callable returning one of those
+        """
+        self.routes[path] = handler
+
+    def post(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+        request = TransportRequest(host=host, path=path, headers=dict(headers), json=json)
+        self.requests.append(request)
+        handler = self.routes.get(path)
+        if handler is None:
+            result = {"responseCode": "404", "message": f"No route registered for {path}", "ok": False}
+            return TransportResponse(404, jsonlib.dumps({"result": result}).encode())
+        if callable(handler):
+            handler = handler(request)
+        if isinstance(handler, TransportResponse):
+            return handler
+        return TransportResponse(200, jsonlib.dumps(handler).encode())
+
+    async def post_async(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+        return self.post(path, headers=headers, json=json, host=host)
+
+
+__all__ = ["MemoryTransport", "TransportRequest"]
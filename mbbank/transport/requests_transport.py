@@ -0,0 +1,76 @@
+import asyncio
+import typing
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .base import Transport, TransportResponse
+
+
+class RequestsTransport(Transport):
+    """
+    Transport using a pooled `requests.Session`, default transport of `MBBank`
+
+    Args:
+        proxy (str, optional): Proxy url. Example: "http://127.0.0.1:8080". Defaults to None.
+        timeout (Union[float, Tuple[float, float]], optional): request timeout in seconds or (connect timeout, read timeout) or None for no timeout. Defaults to None.
+        pool_connections (int, optional): number of host connection pools to cache. Defaults to 10.
+        pool_maxsize (int, optional): maximum number of connections kept per host pool. Defaults to 10.
+        max_retries (int, optional): number of retries on connection errors ( request not sent yet so safe to retry ). Defaults to 3.
+        base_urls (dict[str, str], optional): override base url per host name. Defaults to `Transport.BASE_URLS`.
+    """
+
+    TIMEOUT_ERRORS: typing.ClassVar[tuple[type[BaseException], ...]] = (
+        *Transport.TIMEOUT_ERRORS,
+        requests.Timeout,
+    )
+
+    def __init__(
+        self,
+        *,
+        proxy: typing.Optional[str] = None,
+        timeout: float | tuple[float, float] | None = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        max_retries: int = 3,
+        base_urls: typing.Optional[dict[str, str]] = None,
+    ):
+        super().__init__(base_urls=base_urls)
+        if proxy is not None:
+            proxy_protocol = proxy.split("://")[0]
+            self.proxy = {proxy_protocol: proxy}
+        else:
+            self.proxy = {}
+        self.timeout = timeout
+        self.session = requests.Session()
+        # only retry connect errors, read errors may happen after the server already handled the request
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(total=None, connect=max_retries, read=0, redirect=0, status=0, other=0),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+        with self.session.post(
+            self.url(path, host),
+            headers=headers,
+            json=json,
+            proxies=self.proxy,
+            timeout=self.timeout,
+        ) as r:
+            return TransportResponse(r.status_code, r.content, r.headers.get("Content-Type", ""))
+
+    async def post_async(self, path: str, *, headers: dict, json: dict, host: str = "online") -> TransportResponse:
+        return await asyncio.to_thread(self.post, path, headers=headers, json=json, host=host)
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        self.close()
+
+
+__all__ = ["RequestsTransport"]